@@ -11,11 +11,32 @@ def create_app(config_name='production'):
     from app.db import close_db
     app.teardown_appcontext(close_db)
 
+    from app.cache import PageCache
+    app.extensions['page_cache'] = PageCache(app.config['PAGE_CACHE_MAX_BYTES'])
+
+    from app.writer import DatabaseWriter
+    app.extensions['writer'] = DatabaseWriter(app)
+
+    from app.assets import load_manifest, asset_url, image_sources
+    app.extensions['assets'] = load_manifest(app.static_folder)
+    app.jinja_env.globals.update(asset_url=asset_url, image_sources=image_sources)
+
+    from app.thumbnails import create_store, thumbnail_url, thumbnail_srcset
+    app.extensions['thumbnails'] = create_store(app)
+    app.jinja_env.globals.update(thumbnail_url=thumbnail_url, thumbnail_srcset=thumbnail_srcset)
+
     from app.routes import register_blueprints
     register_blueprints(app)
 
-    from app.db import ensure_category_columns
-    with app.app_context():
-        ensure_category_columns()
+    from app.commands import register_commands
+    register_commands(app)
+
+    from app.migrations import check_schema
+    check_schema(app)
+
+    # After check_schema, so workers don't start before the jobs table exists
+    from app.jobs import JobRunner
+    app.extensions['jobs'] = JobRunner(app)
+    app.before_request(app.extensions['jobs'].ensure_started)
 
     return app
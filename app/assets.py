@@ -0,0 +1,184 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+
+from flask import current_app, url_for
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Built assets live in static/dist, named after a hash of their content
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+
+COMPRESSED_TYPES = ('.css', '.js', '.svg', '.json', '.txt')
+IMAGE_TYPES = ('.png', '.jpg', '.jpeg')
+IMAGE_WIDTHS = (32, 64, 128, 256, 512, 1024, 1920)
+# format -> (Pillow format, save options, MIME type)
+IMAGE_FORMATS = {
+    'png': ('PNG', {'optimize': True}, 'image/png'),
+    'webp': ('WEBP', {'quality': 80, 'method': 6}, 'image/webp'),
+    'avif': ('AVIF', {'quality': 50}, 'image/avif'),
+}
+
+
+def _fingerprint(path, data, suffix=''):
+    base, ext = os.path.splitext(path)
+    return f'{base}.{hashlib.sha256(data).hexdigest()[:10]}{suffix}{ext}'
+
+
+def _write(dist, name, data, compress=False):
+    path = os.path.join(dist, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(data)
+    if compress:
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, 9))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+
+
+def _build_image(dist, path, data, source):
+    """Hashed original plus PNG/WebP/AVIF variants at every IMAGE_WIDTHS step up to its width."""
+    from PIL import Image
+
+    entry = {'file': _fingerprint(path, data), 'variants': {}}
+    _write(dist, entry['file'], data)
+    with Image.open(source) as image:
+        image.load()
+        entry['width'] = image.width
+        widths = [w for w in IMAGE_WIDTHS if w < image.width]
+        if image.width <= IMAGE_WIDTHS[-1]:
+            widths.append(image.width)
+        for fmt, (pil_format, options, mime) in IMAGE_FORMATS.items():
+            variants = entry['variants'][fmt] = {}
+            for width in widths:
+                height = max(1, round(image.height * width / image.width))
+                resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+                if pil_format != 'PNG' and resized.mode == 'P':
+                    resized = resized.convert('RGBA')
+                name = _fingerprint(f'{os.path.splitext(path)[0]}.{fmt}', data, f'.w{width}')
+                target = os.path.join(dist, name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                resized.save(target, pil_format, **options)
+                variants[width] = name
+    return entry
+
+
+def _modern_formats():
+    """(format, MIME type) of the formats browsers pick over PNG, smallest first."""
+    return [(fmt, IMAGE_FORMATS[fmt][2]) for fmt in ('avif', 'webp')]
+
+
+def _largest(entry, fmt, max_width=1920):
+    widths = [w for w in entry['variants'].get(fmt, {}) if w <= max_width]
+    return entry['variants'][fmt][max(widths)] if widths else entry['file']
+
+
+def _rewrite_css(css, manifest):
+    """Point /static/ URLs at the built files; raster backgrounds get an AVIF/WebP image-set()."""
+    def background(match):
+        entry = manifest.get(match.group(2))
+        if entry is None or not entry.get('variants'):
+            return match.group(0)
+        candidates = ', '.join(f"url('/static/{DIST_DIR}/{_largest(entry, fmt)}') type('{mime}')"
+                               for fmt, mime in _modern_formats())
+        fallback = f"url('/static/{DIST_DIR}/{_largest(entry, 'png')}')"
+        return (f"{match.group(1)}background-image: {fallback};\n"
+                f"{match.group(1)}background-image: image-set({candidates}, {fallback} type('image/png'));")
+
+    def url(match):
+        entry = manifest.get(match.group(1))
+        return f"url('/static/{DIST_DIR}/{entry['file']}')" if entry else match.group(0)
+
+    css = re.sub(r"^(\s*)background-image:\s*url\(['\"]?/static/([^'\")]+)['\"]?\);", background, css, flags=re.M)
+    return re.sub(r"url\(['\"]?/static/([^'\")]+)['\"]?\)", url, css)
+
+
+def build_assets(static_folder):
+    """Write fingerprinted, precompressed assets and image variants to static/dist.
+
+    Returns the manifest: source path (relative to static/) -> built files.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    staging = dist + '.new'
+    shutil.rmtree(staging, ignore_errors=True)
+
+    sources = []
+    for directory, subdirs, files in os.walk(static_folder):
+        subdirs[:] = [d for d in subdirs if os.path.join(directory, d) not in (dist, staging)]
+        for filename in files:
+            sources.append(os.path.relpath(os.path.join(directory, filename), static_folder).replace(os.sep, '/'))
+
+    manifest = {}
+    # Images first, so stylesheets can refer to their built names
+    for path in sorted(sources, key=lambda p: not p.lower().endswith(IMAGE_TYPES)):
+        source = os.path.join(static_folder, path)
+        with open(source, 'rb') as f:
+            data = f.read()
+        if path.lower().endswith(IMAGE_TYPES):
+            manifest[path] = _build_image(staging, path, data, source)
+            continue
+        if path.endswith('.css'):
+            data = _rewrite_css(data.decode('utf-8'), manifest).encode('utf-8')
+        manifest[path] = {'file': _fingerprint(path, data)}
+        _write(staging, manifest[path]['file'], data, compress=path.endswith(COMPRESSED_TYPES))
+
+    with open(os.path.join(staging, MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    shutil.rmtree(dist, ignore_errors=True)
+    os.replace(staging, dist)
+    return manifest
+
+
+def load_manifest(static_folder):
+    """The manifest written by build_assets(), or {} when the assets were not built."""
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST)) as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        return {}
+    for entry in manifest.values():
+        for fmt, variants in entry.get('variants', {}).items():
+            entry['variants'][fmt] = {int(width): name for width, name in variants.items()}
+    return manifest
+
+
+def asset_url(path, width=None, format=None):
+    """URL of a static file: its fingerprinted build if there is one, else the plain file.
+
+    For images, `width` and `format` pick the smallest built variant at
+    least that wide in that format.
+    """
+    entry = current_app.extensions['assets'].get(path)
+    if entry is None:
+        return url_for('static', filename=path)
+    name = entry['file']
+    if width or format:
+        variants = entry.get('variants', {}).get(format or 'png', {})
+        wide_enough = [w for w in variants if w >= (width or 0)]
+        if wide_enough:
+            name = variants[min(wide_enough)]
+    return url_for('static', filename=f'{DIST_DIR}/{name}')
+
+
+def image_sources(path):
+    """[(MIME type, srcset)] of the AVIF and WebP variants of an image, best format first."""
+    entry = current_app.extensions['assets'].get(path)
+    if entry is None:
+        return []
+    sources = []
+    for fmt, mime in _modern_formats():
+        variants = entry.get('variants', {}).get(fmt)
+        if variants:
+            srcset = ', '.join(f"{url_for('static', filename=f'{DIST_DIR}/{name}')} {width}w"
+                               for width, name in sorted(variants.items()))
+            sources.append((mime, srcset))
+    return sources
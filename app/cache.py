@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from flask import make_response, request
+
+
+class CachedPage:
+    """A rendered page plus the validators sent with it."""
+
+    def __init__(self, version, body, last_modified):
+        self.version = version
+        self.body = body
+        self.etag = hashlib.md5(body).hexdigest()
+        self.last_modified = last_modified
+
+    def response(self):
+        """Build the response for the current request (304 if the client is up to date)."""
+        response = make_response(self.body)
+        response.set_etag(self.etag)
+        response.last_modified = self.last_modified
+        # Always revalidate: the page changes as soon as an admin edits the catalog
+        response.cache_control.no_cache = True
+        return response.make_conditional(request)
+
+
+class PageCache:
+    """Byte-bounded LRU of rendered pages, tagged with the catalog data version.
+
+    An entry rendered for an older version is treated as a miss and dropped.
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.version != version:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, version, body, last_modified=None):
+        entry = CachedPage(version, body, last_modified or datetime.now(timezone.utc))
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self.size += len(body)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, key):
+        self.size -= len(self._entries.pop(key).body)
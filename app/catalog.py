@@ -0,0 +1,191 @@
+import json
+import threading
+from functools import cached_property
+from datetime import datetime, timezone
+from types import MappingProxyType
+from flask import current_app, g
+
+from app.db import get_db, get_songs, search_song_ids
+from app.categories import categorize_video
+from app.facet_index import FacetIndex
+from app.trigrams import TrigramIndex, FUZZY_BELOW_HITS, fold, is_short_query
+from app.suggest import SuggestIndex
+from app.catalog_blob import CatalogBlob
+
+# The data version is the seq of the newest change feed entry: the feed's triggers
+# write it in the same transaction as the data, so a write from any process (a job
+# worker, `flask run-jobs`, a script) moves it. The snapshot is rebuilt lazily when it lags.
+_started_at = datetime.now(timezone.utc)
+_snapshot = None
+_lock = threading.Lock()
+
+
+def _current_version():
+    """(data version, when it changed), read once per request (or app context)."""
+    if 'data_version' not in g:
+        row = get_db().execute('SELECT seq, changed_at FROM changes ORDER BY seq DESC LIMIT 1').fetchone()
+        if row is None:
+            g.data_version = (0, _started_at)
+        else:
+            changed_at = datetime.strptime(row[1], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+            g.data_version = (row[0], changed_at)
+    return g.data_version
+
+
+def data_version():
+    return _current_version()[0]
+
+
+def data_changed_at():
+    """When the data version last changed (process start while the change feed is empty)."""
+    return _current_version()[1]
+
+
+def invalidate_catalog():
+    """After a write: read the data version again, so the rest of this request sees the write."""
+    g.pop('data_version', None)
+
+
+def get_catalog():
+    """Return the current catalog snapshot, rebuilding it if the data changed."""
+    global _snapshot
+    database = current_app.config['DATABASE_PATH']
+    version = data_version()
+    snapshot = _snapshot
+    # Any other version, lower too: a restored database can go back to an older seq
+    if snapshot is not None and snapshot.version == version and snapshot.database == database:
+        return snapshot
+
+    with _lock:
+        if _snapshot is None or _snapshot.version != version or _snapshot.database != database:
+            # Tagged with the version read before the rows: a write landing in between
+            # leaves it behind, so the next request rebuilds
+            _snapshot = Catalog(version, get_songs(), database)
+        return _snapshot
+
+
+def timestamp_url(url, timestamp):
+    """Append a `&t=<seconds>s` offset to a YouTube URL from a MM:SS timestamp."""
+    if url and timestamp and ':' in timestamp:
+        parts = timestamp.split(':')
+        if len(parts) == 2:
+            try:
+                return f"{url}&t={int(parts[0]) * 60 + int(parts[1])}s"
+            except ValueError:
+                pass
+    return url
+
+
+def _json_list(value):
+    if not value:
+        return None
+    try:
+        decoded = json.loads(value)
+    except (TypeError, ValueError):
+        return None
+    return tuple(decoded) if isinstance(decoded, list) else decoded
+
+
+def song_record(s):
+    """Preprocess one get_songs() row into the read-only record the songs view renders."""
+    return MappingProxyType({
+        'id': s['id'], 'video_id': s['video_id'],
+        'title': s['song_title'], 'composer': s['composer'] or '',
+        'performer': s['performer'] or '', 'original_artist': s['original_artist'] or '',
+        'songwriters': _json_list(s['songwriters']), 'composition_year': s['composition_year'],
+        'style': s['style'] or '', 'era': s['era'] or '',
+        'other_musicians': _json_list(s['other_musicians']), 'additional_info': s['additional_info'] or '',
+        'url': timestamp_url(s['url'], s['timestamp']), 'video_title': s['video_title'],
+        'description': s['description'],
+        'category': s['category'] or categorize_video(s['video_title'], s['description']),
+        'published_at': s['published_at'],
+        'part_number': s['part_number'], 'total_parts': s['total_parts'],
+        'album': s['album'] or '', 'record_label': s['record_label'] or '',
+        'recording_year': s['recording_year'], 'featured_artists': _json_list(s['featured_artists']),
+        'context_notes': s['context_notes'] or '',
+        'analysis_depth': s['analysis_depth'] or '',
+        'thumbnail_url': s['thumbnail_url'],
+        'video_type': s['video_type'] or 'uncategorized'
+    })
+
+
+def index_entry(s):
+    """Preprocess one get_songs() row into a Real Book index line."""
+    return MappingProxyType({
+        'id': s['id'],
+        'song_title': s['song_title'] or 'Sans titre',
+        'composer': s['composer'] or '',
+        'performer': s['performer'] or '',
+        'album': s['album'] or '',
+        'style': s['style'] or '',
+        'url': timestamp_url(s['url'], s['timestamp']) or '',
+        'analysis_depth': s['analysis_depth'] or ''
+    })
+
+
+def index_letter(title):
+    """Real Book section of a title: its accent-folded initial ('Été' -> 'E'), '#' if not a letter."""
+    initial = fold(title)[:1].upper()
+    return initial if 'A' <= initial <= 'Z' else '#'
+
+
+class Catalog:
+    """Immutable, preprocessed view of every visible song.
+
+    Records are read-only mappings so they can be shared between requests;
+    the orderings used by the views and the facet, trigram and suggestion
+    indexes behind the filters are computed once per snapshot.
+    """
+
+    def __init__(self, version, rows, database=None):
+        self.version = version
+        self.database = database
+
+        songs = []
+        index_entries = []
+        for s in rows:
+            songs.append(song_record(s))
+            index_entries.append(index_entry(s))
+
+        self.songs = tuple(songs)
+        self.by_id = MappingProxyType({s['id']: s for s in songs})
+        self.by_title = tuple(sorted(songs, key=lambda x: (x['title'] or '').lower()))
+        self.by_date = tuple(sorted(songs, key=lambda x: x['published_at'] or '', reverse=True))
+        buckets = {}
+        for entry in sorted(index_entries, key=lambda x: (fold(x['song_title']), x['song_title'].lower())):
+            buckets.setdefault(index_letter(entry['song_title']), []).append(entry)
+        self.index_buckets = MappingProxyType({letter: tuple(buckets[letter]) for letter in sorted(buckets)})
+        self.facets = FacetIndex(rows)
+        self.trigrams = TrigramIndex(rows)
+        self.suggestions = SuggestIndex(rows)
+
+    @cached_property
+    def blob(self):
+        """Columnar, precompressed copy of the catalog for client-side filtering (built on first use)."""
+        return CatalogBlob(self)
+
+    def search(self, text):
+        """(ids of the songs matching `text` best first, ids of its fuzzy matches most similar first).
+
+        The fuzzy trigram matches, which catch typos, are only looked for when
+        full-text search (whole words or prefixes, any accents) finds fewer
+        than FUZZY_BELOW_HITS songs, and never for short queries.
+        """
+        ids = search_song_ids(text)
+        if len(ids) >= FUZZY_BELOW_HITS or is_short_query(text):
+            return ids, []
+        found = set(ids)
+        return ids, [song_id for song_id, similarity in self.trigrams.search(text) if song_id not in found]
+
+    def _search(self, filters):
+        return self.search(filters['search']) if filters.get('search') else ((), ())
+
+    def select(self, filters, sort='date'):
+        """Records of the songs matching `filters` (see song_filters()), in `sort` order."""
+        search_ids, fuzzy_ids = self._search(filters)
+        return [self.songs[pos] for pos in self.facets.select(filters, sort, search_ids, fuzzy_ids)]
+
+    def facet_counts(self, filters):
+        """Per-option counts for `filters`, each facet ignoring its own filter."""
+        search_ids, fuzzy_ids = self._search(filters)
+        return self.facets.counts(filters, [*search_ids, *fuzzy_ids])
@@ -0,0 +1,40 @@
+import gzip
+import hashlib
+import json
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+from app.db import split_people, person_key
+
+
+class CatalogBlob:
+    """The catalog as one columnar JSON document for client-side filtering.
+
+    Facet values are stored once in per-facet dictionaries and each song
+    refers to them by index; `people` lists the person codes behind every
+    composer/performer value so the people filters match like the server's.
+    `orders` holds the song positions for each sort. The body is
+    precompressed and named by its hash, so it can be cached forever.
+    """
+
+    def __init__(self, catalog):
+        index = catalog.facets
+        people = {key: code for code, key in enumerate(sorted({key for role, key in index.people if role is None}))}
+        document = {
+            'ids': [song['id'] for song in catalog.songs],
+            'dictionaries': index.values,
+            'columns': {facet: codes.tolist() for facet, codes in index.codes.items()},
+            'people': {facet: [sorted(people[person_key(name)] for name in split_people(value)
+                                      if person_key(name) in people)
+                               for value in index.values[facet]]
+                       for facet in ('composer', 'performer')},
+            'orders': {sort: order.tolist() for sort, order in index.orders.items()},
+        }
+        self.body = json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode()
+        self.version = hashlib.sha256(self.body).hexdigest()[:16]
+        self.encodings = {'gzip': gzip.compress(self.body, 9)}
+        if brotli is not None:
+            self.encodings['br'] = brotli.compress(self.body, quality=11)
@@ -1,23 +1,39 @@
-def categorize_video(title, description):
-    """Categorize videos by type using keyword matching."""
-    title_lower = title.lower()
+import re
+from functools import lru_cache
 
-    if any(word in title_lower for word in ['générique', 'magnum', 'mission impossible', 'james bond', 'star trek', 'code quantum', 'amicalement vôtre', 'quatrième dimension', 'cinéma du dimanche']):
-        return 'Génériques TV'
+# Checked in order: the first category with a keyword in the title wins.
+CATEGORY_RULES = [
+    ('Génériques TV', ['générique', 'magnum', 'mission impossible', 'james bond', 'star trek', 'code quantum', 'amicalement vôtre', 'quatrième dimension', 'cinéma du dimanche']),
+    ('BO Films', ['mission to mars', 'morricone', 'yared', 'legrand', 'cosma', 'b.o', 'costa yared']),
+    ('Chansons/Standards', ['que je t\'aime', 'pénitencier', 'yesterday', 'nature boy', 'embraceable you', 'my funny valentine', 'all of you', 'satin doll', 'marseillaise', 'god save', 'skylark', 'etienne', 'vivre quand on aime', 'kamasutra']),
+    ('Jeux Vidéo', ['jeux vidéo', 'goldeneye', 'mario', 'videogames']),
+    ('Théorie/Analyse', ['analyse', 'harmoni', 'modal', 'accord', 'improvisation', 'technique', 'concept', 'appoggiature', 'cadence', 'gamme', 'échelle', 'dorien', 'ionien', 'phrygien', 'lydien', 'mixolydien', 'éolien', 'locrien']),
+    ('Interviews/Culture', ['chronique', 'interview', 'culture', 'avec', 'galper', 'terrasson', 'bojan', 'paczynski', 'naïditch', 'quincy jones', 'lucas debargue']),
+]
+DEFAULT_CATEGORY = 'Autres'
 
-    if any(word in title_lower for word in ['mission to mars', 'morricone', 'yared', 'legrand', 'cosma', 'b.o', 'costa yared']):
-        return 'BO Films'
+_KEYWORD_RANK = {}
+for _rank, (_category, _keywords) in enumerate(CATEGORY_RULES):
+    for _keyword in _keywords:
+        _KEYWORD_RANK.setdefault(_keyword, _rank)
 
-    if any(word in title_lower for word in ['que je t\'aime', 'pénitencier', 'yesterday', 'nature boy', 'embraceable you', 'my funny valentine', 'all of you', 'satin doll', 'marseillaise', 'god save', 'skylark', 'etienne', 'vivre quand on aime', 'kamasutra']):
-        return 'Chansons/Standards'
+# One pass over the title: the lookahead reports a match at every position
+# (overlapping ones included) and keywords are listed in rule order, so the
+# lowest rank found is the category the rules would pick.
+_KEYWORDS_RE = re.compile('(?=({}))'.format('|'.join(
+    re.escape(k) for k in sorted(_KEYWORD_RANK, key=_KEYWORD_RANK.get))))
 
-    if any(word in title_lower for word in ['jeux vidéo', 'goldeneye', 'mario', 'videogames']):
-        return 'Jeux Vidéo'
 
-    if any(word in title_lower for word in ['analyse', 'harmoni', 'modal', 'accord', 'improvisation', 'technique', 'concept', 'appoggiature', 'cadence', 'gamme', 'échelle', 'dorien', 'ionien', 'phrygien', 'lydien', 'mixolydien', 'éolien', 'locrien']):
-        return 'Théorie/Analyse'
+@lru_cache(maxsize=4096)
+def _categorize_title(title_lower):
+    best = len(CATEGORY_RULES)
+    for match in _KEYWORDS_RE.finditer(title_lower):
+        best = min(best, _KEYWORD_RANK[match.group(1)])
+        if best == 0:
+            break
+    return CATEGORY_RULES[best][0] if best < len(CATEGORY_RULES) else DEFAULT_CATEGORY
 
-    if any(word in title_lower for word in ['chronique', 'interview', 'culture', 'avec', 'galper', 'terrasson', 'bojan', 'paczynski', 'naïditch', 'quincy jones', 'lucas debargue']):
-        return 'Interviews/Culture'
 
-    return 'Autres'
+def categorize_video(title, description):
+    """Categorize videos by type using keyword matching."""
+    return _categorize_title((title or '').lower())
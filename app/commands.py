@@ -0,0 +1,122 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from app.db import get_db, refresh_category_facet, sync_song_people
+from app.categories import categorize_video
+
+
+@click.command('backfill-categories')
+@with_appcontext
+def backfill_categories():
+    """Store the keyword category of every uncategorized video in videos.category."""
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('SELECT id, title, description FROM videos WHERE category IS NULL')
+    updates = [(categorize_video(title, description), video_id)
+               for video_id, title, description in cursor.fetchall()]
+
+    cursor.executemany('UPDATE videos SET category = ? WHERE id = ?', updates)
+    refresh_category_facet()
+    db.commit()
+    click.echo(f"Categorized {len(updates)} video(s)")
+
+
+@click.command('migrate')
+@click.option('--list', 'list_only', is_flag=True, help='Only show the pending migrations')
+@with_appcontext
+def migrate_command(list_only):
+    """Apply pending schema migrations (run before deploying new code)."""
+    from app.migrations import migrate, pending, schema_version
+
+    db = get_db()
+    todo = pending(db)
+    if list_only:
+        for version, name in todo:
+            click.echo(name)
+        click.echo(f"Schema at version {schema_version(db)}, {len(todo)} migration(s) pending")
+        return
+    applied = migrate(db, log=click.echo)
+    click.echo(f"Schema at version {schema_version(db)}, applied {len(applied)} migration(s)")
+
+
+@click.command('rebuild-people')
+@with_appcontext
+def rebuild_people():
+    """Re-derive people/song_people from the songs table (e.g. after llm_full_extract)."""
+    db = get_db()
+    sync_song_people()
+    db.commit()
+    count = db.execute('SELECT COUNT(*) FROM people').fetchone()[0]
+    click.echo(f"Linked songs to {count} people")
+
+
+@click.command('export-static')
+@click.option('--out', help='Snapshot root (defaults to STATIC_SNAPSHOT_DIR)')
+@click.option('--watch', is_flag=True, help='Keep running and re-export after every change')
+@click.option('--interval', default=60.0, show_default=True, help='With --watch: minimum seconds between exports')
+@with_appcontext
+def export_static_command(out, watch, interval):
+    """Render the public site into a static snapshot under <out>/current."""
+    from app.snapshot import export_static, watch_export
+
+    root = out or current_app.config['STATIC_SNAPSHOT_DIR']
+    if not root:
+        raise click.UsageError('Pass --out or set STATIC_SNAPSHOT_DIR')
+    if watch:
+        watch_export(current_app._get_current_object(), root, interval, log=click.echo)
+        return
+    target = export_static(current_app._get_current_object(), root)
+    click.echo(f"Exported static snapshot to {target}")
+
+
+@click.command('build-assets')
+@with_appcontext
+def build_assets_command():
+    """Fingerprint, precompress and convert static/ into static/dist (run at deploy time)."""
+    from flask import current_app
+    from app.assets import build_assets
+
+    manifest = build_assets(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} asset(s) into static/dist")
+
+
+@click.command('fetch-thumbnails')
+@with_appcontext
+def fetch_thumbnails_command():
+    """Fill the thumbnail cache for every video, so no visitor waits on YouTube."""
+    from app.thumbnails import get_store
+
+    store = get_store()
+    rows = get_db().execute('SELECT id, thumbnail_url FROM videos WHERE thumbnail_url IS NOT NULL').fetchall()
+    failed = 0
+    for video_id, source_url in rows:
+        try:
+            store.build(video_id, source_url, retry_failed=True)
+        except Exception as e:
+            failed += 1
+            click.echo(f"  {source_url}: {e}")
+    click.echo(f"Cached thumbnails for {len(rows) - failed} of {len(rows)} video(s)")
+
+
+@click.command('run-jobs')
+@click.option('--workers', default=2, show_default=True, help='Worker threads')
+@with_appcontext
+def run_jobs_command(workers):
+    """Run queued background jobs until interrupted (e.g. alongside web processes with JOB_WORKERS=0)."""
+    current_app.extensions['jobs'].ensure_started(workers)
+    click.echo(f"Running jobs with {workers} worker(s), Ctrl+C to stop")
+    while True:
+        time.sleep(3600)
+
+
+def register_commands(app):
+    app.cli.add_command(backfill_categories)
+    app.cli.add_command(migrate_command)
+    app.cli.add_command(rebuild_people)
+    app.cli.add_command(export_static_command)
+    app.cli.add_command(build_assets_command)
+    app.cli.add_command(fetch_thumbnails_command)
+    app.cli.add_command(run_jobs_command)
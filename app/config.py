@@ -12,11 +12,46 @@ from admin_config import ADMIN_USERNAME, ADMIN_PASSWORD, AUTO_LOGIN, SECRET_KEY
 class Config:
     SECRET_KEY = SECRET_KEY
     DATABASE_PATH = os.path.join(os.path.dirname(__file__), '..', 'database', 'piano_jazz_videos.db')
+    # Run `flask migrate` before deploying: until then the app answers 503. With 1, startup applies them itself
+    MIGRATE_ON_STARTUP = os.getenv('MIGRATE_ON_STARTUP', '0') == '1'
+    # See app.db.PRAGMA_PROFILES
+    SQLITE_PROFILE = os.getenv('SQLITE_PROFILE', 'default')
+    SQLITE_CACHED_STATEMENTS = 512
+    SQLITE_BUSY_TIMEOUT = 10.0
+    # All writes go through one thread (app.writer): queued writes beyond this many get a 503,
+    # and up to WRITE_BATCH_SIZE of them share a commit
+    WRITE_QUEUE_SIZE = 256
+    WRITE_QUEUE_TIMEOUT = 10.0
+    WRITE_BATCH_SIZE = 64
+    # Background jobs (app.jobs) run in JOB_WORKERS threads per web process (0: only in `flask run-jobs`);
+    # a job whose worker stops renewing its lease is run again, up to JOB_MAX_ATTEMPTS times
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+    JOB_LEASE_SECONDS = 60
+    JOB_MAX_ATTEMPTS = 3
+    JOB_POLL_INTERVAL = 5.0
+    # Done and failed jobs are deleted this many days after they finish
+    JOB_RETENTION_DAYS = 7
     ADMIN_USERNAME = ADMIN_USERNAME
     ADMIN_PASSWORD = ADMIN_PASSWORD
     AUTO_LOGIN = AUTO_LOGIN
     OPENAI_API_KEY = os.getenv('OPENAI_API_KEY')
     YOUTUBE_API_KEY = os.getenv('YOUTUBE_API_KEY')
+    API_PAGE_SIZE = 50
+    API_MAX_PAGE_SIZE = 500
+    PAGE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    # Stream the songs page row by row instead of rendering it whole
+    STREAM_LISTINGS = False
+    # The Real Book page renders whole letters until it has this many songs; the rest load on demand
+    INDEX_INITIAL_SONGS = 100
+    # Let main.js filter and sort the songs page locally from the columnar catalog blob
+    CLIENT_FILTERING = False
+    # Where `flask export-static` writes the static export of the public site (`--watch` keeps it current)
+    STATIC_SNAPSHOT_DIR = os.getenv('STATIC_SNAPSHOT_DIR')
+    # Resized WebP copies of the YouTube thumbnails; THUMBNAIL_FIXTURES reads sources from disk instead of HTTP
+    THUMBNAIL_DIR = os.path.join(os.path.dirname(__file__), '..', 'database', 'thumbnails')
+    THUMBNAIL_FIXTURES = os.getenv('THUMBNAIL_FIXTURES')
+    # Seconds before a thumbnail whose source failed is fetched again
+    THUMBNAIL_RETRY_AFTER = 3600
     YOUTUBE_CLIENT_SECRET_PATH = os.path.join(
         os.path.dirname(__file__), '..', 'config',
         'client_secret_669231030065-of0u2ovg4sqs69ho0r70m9a3so5obmm6.apps.googleusercontent.com.json'
@@ -1,60 +1,488 @@
+import json
+import os
+import re
 import sqlite3
-from flask import g, current_app
+import threading
+from urllib.parse import quote
+
+from flask import g, current_app, has_request_context
+
+from app.categories import categorize_video
+from app.trigrams import is_short_query
+
+# Connection settings by name (Config.SQLITE_PROFILE), applied to every connection
+PRAGMA_PROFILES = {
+    # Under WAL, synchronous=NORMAL only risks the last commits on power loss, never corruption
+    'default': {'synchronous': 'NORMAL', 'cache_size': -32000, 'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY'},
+    # Every commit is on disk before it returns
+    'durable': {'synchronous': 'FULL', 'cache_size': -32000, 'mmap_size': 256 * 1024 * 1024,
+                'temp_store': 'MEMORY'},
+    # Small hosts: SQLite's default page cache, no memory mapping
+    'low-memory': {'synchronous': 'NORMAL', 'cache_size': -2000, 'mmap_size': 0, 'temp_store': 'FILE'},
+}
+
+# Each thread keeps its connections open across requests: {(path, read-only): connection}
+_local = threading.local()
+
+
+def _connect(path, readonly):
+    config = current_app.config
+    options = {'timeout': config['SQLITE_BUSY_TIMEOUT'], 'cached_statements': config['SQLITE_CACHED_STATEMENTS']}
+    if readonly:
+        db = sqlite3.connect(f'file:{quote(os.path.abspath(path))}?mode=ro', uri=True, **options)
+    else:
+        db = sqlite3.connect(path, **options)
+        # Persistent in the file: readers then never wait for a writer, nor a writer for readers
+        db.execute('PRAGMA journal_mode = WAL')
+    for name, value in PRAGMA_PROFILES[config['SQLITE_PROFILE']].items():
+        db.execute(f'PRAGMA {name} = {value}')
+    db.row_factory = sqlite3.Row
+    # Lets SQL filter on the same category the views display
+    db.create_function('categorize_video', 2, categorize_video, deterministic=True)
+    return db
 
 
 def get_db():
+    """The current thread's connection to the database, opened on first use.
+
+    Requests get a read-only connection: their writes go through the writer
+    thread (app.writer). The writer, job workers, CLI commands and startup
+    migrations get the read-write one.
+    """
     if 'db' not in g:
-        g.db = sqlite3.connect(current_app.config['DATABASE_PATH'], timeout=10.0)
-        g.db.row_factory = sqlite3.Row
+        readonly = has_request_context()
+        key = (current_app.config['DATABASE_PATH'], readonly)
+        connections = getattr(_local, 'connections', None)
+        if connections is None:
+            connections = _local.connections = {}
+        if key not in connections:
+            connections[key] = _connect(*key)
+        g.db = connections[key]
     return g.db
 
 
 def close_db(e=None):
     db = g.pop('db', None)
-    if db is not None:
-        db.close()
+    # The connection stays open for the thread's next request, minus anything left uncommitted
+    if db is not None and db.in_transaction:
+        db.rollback()
+
+
+# Facet name (as used in the URL) -> songs column, maintained by triggers
+FACET_COLUMNS = {'composer': 'composer', 'performer': 'performer', 'style': 'style',
+                 'era': 'era', 'depth': 'analysis_depth'}
 
+CATEGORY_EXPR = 'COALESCE(s.category, v.category, categorize_video(v.title, v.description))'
 
-def ensure_category_columns():
-    """Auto-migration: Add category/analysis_depth columns if they don't exist."""
+
+def refresh_category_facet():
+    """Recount the category facet.
+
+    Categories fall back to keyword matching in Python, which triggers can't
+    call, so the endpoints that can change a category run this before committing.
+    """
+    db = get_db()
+    db.execute("DELETE FROM facet_counts WHERE facet = 'category'")
+    db.execute(f'''
+        INSERT INTO facet_counts(facet, value, count)
+        SELECT 'category', {CATEGORY_EXPR} AS value, COUNT(*)
+        FROM songs s
+        LEFT JOIN videos v ON s.video_id = v.id
+        WHERE (s.deleted IS NULL OR s.deleted = 0)
+        GROUP BY value
+    ''')
+
+
+def get_facets():
+    """Return {facet: [(value, count), ...]} for every facet, values sorted."""
+    cursor = get_db().cursor()
+    cursor.execute('SELECT facet, value, count FROM facet_counts ORDER BY facet, value')
+    facets = {facet: [] for facet in ('category', *FACET_COLUMNS)}
+    for facet, value, count in cursor.fetchall():
+        facets.setdefault(facet, []).append((value, count))
+    return facets
+
+
+# --- People (composers, performers, ...) ---
+
+# songs column -> role stored in song_people
+PEOPLE_ROLES = {'composer': 'composer', 'performer': 'performer',
+                'featured_artists': 'featured_artist', 'songwriters': 'songwriter',
+                'other_musicians': 'other_musician'}
+
+
+def split_people(value):
+    """Names in a people field: a JSON list (llm_full_extract, auto_update) or comma-joined text."""
+    if not value:
+        return []
+    names = None
+    if value.lstrip().startswith('['):
+        try:
+            names = json.loads(value)
+        except ValueError:
+            pass
+    if not isinstance(names, list):
+        names = re.split(r'\s*[,;/]\s*', value)
+    result = []
+    for name in names:
+        if isinstance(name, dict):
+            name = name.get('name')
+        if isinstance(name, str):
+            name = re.sub(r'^(?:and|et)\s+', '', name.strip())
+            if name:
+                result.append(name)
+    return result
+
+
+def person_key(name):
+    return ' '.join(name.casefold().split())
+
+
+def partial_name_matches(key, name_key):
+    """Whether the person_key of a partial name ('ellington', 'bill ev') starts at a word of `name_key`.
+
+    Filters fall back to this when no one has exactly that name, so links
+    made when the filters matched substrings of the field keep working.
+    """
+    return f' {key}' in f' {name_key}'
+
+
+def sync_song_people(song_ids=None):
+    """Re-derive the song_people links of `song_ids` (every song if None) from their text fields.
+
+    The names are parsed in Python, so the write endpoints call this after
+    inserting or editing songs; deletes are handled by a trigger.
+    """
     db = get_db()
     cursor = db.cursor()
+    columns = ', '.join(PEOPLE_ROLES)
+    if song_ids is None:
+        cursor.execute('DELETE FROM song_people')
+        cursor.execute(f'SELECT id, {columns} FROM songs')
+        rows = cursor.fetchall()
+    else:
+        song_ids = list(song_ids)
+        if not song_ids:
+            return
+        cursor.executemany('DELETE FROM song_people WHERE song_id = ?', [(i,) for i in song_ids])
+        rows = []
+        for i in range(0, len(song_ids), 500):
+            chunk = song_ids[i:i + 500]
+            cursor.execute(f"SELECT id, {columns} FROM songs WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+            rows.extend(cursor.fetchall())
+
+    links = set()
+    names = {}
+    for row in rows:
+        for column, role in PEOPLE_ROLES.items():
+            for name in split_people(row[column]):
+                key = person_key(name)
+                names.setdefault(key, name)
+                links.add((row['id'], key, role))
+    if not links:
+        return
+
+    cursor.executemany('INSERT OR IGNORE INTO people (name, name_key) VALUES (?, ?)',
+                       [(name, key) for key, name in names.items()])
+    person_ids = {}
+    keys = list(names)
+    for i in range(0, len(keys), 500):
+        chunk = keys[i:i + 500]
+        cursor.execute(f"SELECT name_key, id FROM people WHERE name_key IN ({','.join('?' * len(chunk))})", chunk)
+        person_ids.update(cursor.fetchall())
+    cursor.executemany('INSERT OR IGNORE INTO song_people (song_id, person_id, role) VALUES (?, ?, ?)',
+                       [(song_id, person_ids[key], role) for song_id, key, role in links])
+
+
+# What the search box looks at: the songs_fts columns
+SEARCH_COLUMNS = ('s.song_title', 's.composer', 's.performer', 's.original_artist', 's.style',
+                  's.era', 's.album', 's.record_label', 'v.title')
+
 
-    cursor.execute("PRAGMA table_info(videos)")
-    videos_columns = [col[1] for col in cursor.fetchall()]
-    if 'category' not in videos_columns:
-        cursor.execute("ALTER TABLE videos ADD COLUMN category TEXT DEFAULT NULL")
-        print("Added category column to videos table")
+def _search_clause(text):
+    """WHERE clause and parameters selecting the songs `text` finds.
 
-    cursor.execute("PRAGMA table_info(songs)")
-    songs_columns = [col[1] for col in cursor.fetchall()]
-    if 'category' not in songs_columns:
-        cursor.execute("ALTER TABLE songs ADD COLUMN category TEXT DEFAULT NULL")
-        print("Added category column to songs table")
-    if 'analysis_depth' not in songs_columns:
-        cursor.execute("ALTER TABLE songs ADD COLUMN analysis_depth TEXT DEFAULT NULL")
-        print("Added analysis_depth column to songs table")
+    Word prefixes through songs_fts, except for short queries ('a', 'c++'),
+    which a one-letter prefix would turn into "anything with a word
+    starting with c": those match as substrings of the searched fields.
+    """
+    if is_short_query(text):
+        pattern = _like_pattern(text.strip())
+        return '(' + ' OR '.join(f"{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS) + ')', \
+            [pattern] * len(SEARCH_COLUMNS)
+    match = fts_query(text)
+    if not match:
+        return '0', []
+    return 's.id IN (SELECT rowid FROM songs_fts WHERE songs_fts MATCH ?)', [match]
 
-    db.commit()
+
+def fts_query(text):
+    """Turn free text into an FTS5 MATCH expression: every word as a quoted prefix."""
+    terms = re.findall(r'\w+', text)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_song_ids(text, limit=None):
+    """Return ids of visible songs matching `text`, best match first."""
+    if is_short_query(text):
+        clause, params = _search_clause(text)
+        cursor = get_db().execute(f'''
+            SELECT s.id FROM songs s LEFT JOIN videos v ON s.video_id = v.id
+            WHERE {clause} AND (s.deleted IS NULL OR s.deleted = 0)
+            ORDER BY s.id{' LIMIT ?' if limit is not None else ''}
+        ''', params + ([limit] if limit is not None else []))
+        return [row[0] for row in cursor.fetchall()]
+
+    match = fts_query(text)
+    if not match:
+        return []
+
+    sql = '''
+        SELECT f.rowid FROM songs_fts f
+        JOIN songs s ON s.id = f.rowid
+        WHERE songs_fts MATCH ? AND (s.deleted IS NULL OR s.deleted = 0)
+        ORDER BY f.rank
+    '''
+    params = [match]
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+
+    cursor = get_db().cursor()
+    cursor.execute(sql, params)
+    return [row[0] for row in cursor.fetchall()]
+
+
+SONG_COLUMNS = '''
+    s.id, s.video_id, s.song_title, s.composer, s.timestamp,
+    s.part_number, s.total_parts, s.performer, s.original_artist,
+    s.songwriters, s.composition_year, s.style, s.era,
+    s.other_musicians, s.additional_info, v.title as video_title,
+    v.url, v.description,
+    s.published_at, s.album, s.record_label, s.recording_year,
+    s.featured_artists, s.context_notes, s.analysis_depth,
+    v.thumbnail_url, v.video_type,
+    COALESCE(s.category, v.category) as category
+'''
 
 
 def get_songs():
     db = get_db()
     cursor = db.cursor()
-    cursor.execute('''
-        SELECT
-            s.id, s.video_id, s.song_title, s.composer, s.timestamp,
-            s.part_number, s.total_parts, s.performer, s.original_artist,
-            s.songwriters, s.composition_year, s.style, s.era,
-            s.other_musicians, s.additional_info, s.video_title,
-            s.video_url as url, s.video_description as description,
-            s.published_at, s.album, s.record_label, s.recording_year,
-            s.featured_artists, s.context_notes, s.analysis_depth,
-            v.thumbnail_url, v.video_type,
-            COALESCE(s.category, v.category) as category
+    cursor.execute(f'''
+        SELECT {SONG_COLUMNS}
         FROM songs s
         LEFT JOIN videos v ON s.video_id = v.id
         WHERE (s.deleted IS NULL OR s.deleted = 0)
         ORDER BY s.song_title ASC
     ''')
     return cursor.fetchall()
+
+
+def get_videos_with_songs(sort='date'):
+    """Return every video plus its visible songs bucketed by video id.
+
+    Two queries whatever the size of the channel: one for the videos, one scan
+    of the songs ordered so each bucket comes out in part order.
+    """
+    db = get_db()
+    cursor = db.cursor()
+    video_order = 'published_at DESC' if sort == 'date' else 'title ASC'
+    cursor.execute(f'SELECT id, title, description, url, published_at, thumbnail_url, video_type, category FROM videos ORDER BY {video_order}')
+    videos = cursor.fetchall()
+
+    cursor.execute('''SELECT video_id, id, song_title, composer, performer, original_artist,
+                    composition_year, style, era, album, record_label,
+                    recording_year, featured_artists, context_notes,
+                    part_number, total_parts
+                    FROM songs WHERE (deleted IS NULL OR deleted = 0)
+                    ORDER BY video_id, part_number, id''')
+    songs_by_video = {}
+    for row in cursor:
+        songs_by_video.setdefault(row['video_id'], []).append(row)
+    return videos, songs_by_video
+
+
+# --- Listing query builder ---
+
+SONG_FILTERS = ('search', 'category', 'composer', 'performer', 'person', 'style', 'era', 'depth')
+
+# Dropdown filters match the selected value anywhere in the field, like the old list filters did
+_LIKE_FILTERS = {'style': 's.style', 'era': 's.era'}
+
+# People filters go through the song_people index: filter name -> role (None = any role)
+_PEOPLE_FILTERS = {'composer': 'composer', 'performer': 'performer', 'person': None}
+
+# The exact person if there is one, else everyone whose name has the value at a word start
+# (the SQL form of partial_name_matches())
+_PERSON_SONGS = '''s.id IN (SELECT sp.song_id FROM song_people sp
+                JOIN people p ON p.id = sp.person_id
+                WHERE (p.name_key = ? OR (NOT EXISTS (SELECT 1 FROM people WHERE name_key = ?)
+                                          AND ' ' || p.name_key LIKE ? ESCAPE '\\')){})'''
+
+SONG_ORDERS = {
+    'date': 's.published_at DESC, s.song_title ASC, s.id ASC',
+    'alpha': 's.song_title COLLATE NOCASE ASC, s.song_title ASC, s.id ASC',
+}
+
+
+def song_filters(args):
+    """Collect the active listing filters from request args ('all' means unset)."""
+    filters = {}
+    for name in SONG_FILTERS:
+        value = args.get(name, '').strip()
+        if value and value != 'all':
+            filters[name] = value
+    return filters
+
+
+def _like_pattern(value):
+    escaped = value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def _filter_clauses(filters):
+    """WHERE clauses and parameters selecting the visible songs matching `filters`."""
+    where = ['(s.deleted IS NULL OR s.deleted = 0)']
+    params = []
+
+    if filters.get('search'):
+        clause, clause_params = _search_clause(filters['search'])
+        where.append(clause)
+        params.extend(clause_params)
+    if filters.get('category'):
+        where.append(f'{CATEGORY_EXPR} = ?')
+        params.append(filters['category'])
+    for name, role in _PEOPLE_FILTERS.items():
+        if filters.get(name):
+            # Every person named in the value must be linked to the song
+            keys = sorted({person_key(n) for n in split_people(filters[name])})
+            if not keys:
+                where.append('0')
+            for key in keys:
+                where.append(_PERSON_SONGS.format(' AND sp.role = ?' if role else ''))
+                params.extend([key, key, '% ' + _like_pattern(key)[1:]])
+                if role:
+                    params.append(role)
+    for name, column in _LIKE_FILTERS.items():
+        if filters.get(name):
+            where.append(f"{column} LIKE ? ESCAPE '\\'")
+            params.append(_like_pattern(filters[name]))
+    if filters.get('depth'):
+        where.append('s.analysis_depth = ?')
+        params.append(filters['depth'])
+    return where, params
+
+
+def build_songs_query(filters, sort='date', columns='s.id', limit=None):
+    """Build one parameterized SELECT over visible songs for a filter set.
+
+    `sort` is a key of SONG_ORDERS, or None to leave the rows unordered.
+    """
+    where, params = _filter_clauses(filters)
+    sql = f'''
+        SELECT {columns}
+        FROM songs s
+        LEFT JOIN videos v ON s.video_id = v.id
+        WHERE {' AND '.join(where)}
+    '''
+    if sort is not None:
+        sql += f'ORDER BY {SONG_ORDERS.get(sort, SONG_ORDERS["date"])}'
+    if limit is not None:
+        sql += ' LIMIT ?'
+        params.append(limit)
+    return sql, params
+
+
+def query_songs(filters, sort='date', columns='s.id', limit=None):
+    return iter_songs(filters, sort, columns, limit).fetchall()
+
+
+def iter_songs(filters, sort='date', columns='s.id', limit=None):
+    """Like query_songs(), but return the live cursor so rows can be consumed one by one."""
+    sql, params = build_songs_query(filters, sort, columns, limit)
+    cursor = get_db().cursor()
+    cursor.execute(sql, params)
+    return cursor
+
+
+def count_songs(filters):
+    sql, params = build_songs_query(filters, sort=None, columns='COUNT(*)')
+    cursor = get_db().cursor()
+    cursor.execute(sql, params)
+    return cursor.fetchone()[0]
+
+
+# --- Keyset pagination ---
+
+# sort -> (key expression, direction). Pages are ordered by (key, id) in that
+# direction; SQLite sorts NULL keys first, so they end up last when descending.
+KEYSET_ORDERS = {
+    'date': ('s.published_at', 'DESC'),
+    'alpha': ('s.song_title COLLATE NOCASE', 'ASC'),
+}
+
+
+def _keyset_clause(sort, key, last_id):
+    """WHERE clause selecting the rows strictly after the (key, id) cursor."""
+    expr, direction = KEYSET_ORDERS[sort]
+    cmp = '<' if direction == 'DESC' else '>'
+    if key is None:
+        if direction == 'DESC':
+            return f'({expr} IS NULL AND s.id {cmp} ?)', [last_id]
+        return f'({expr} IS NOT NULL OR s.id {cmp} ?)', [last_id]
+    clause = f'({expr} {cmp} ? OR ({expr} = ? AND s.id {cmp} ?)'
+    if direction == 'DESC':
+        clause += f' OR {expr} IS NULL'
+    return clause + ')', [key, key, last_id]
+
+
+def query_songs_page(filters, sort='date', after=None, limit=50, columns='s.*'):
+    """One page of visible songs in keyset order.
+
+    `after` is the (key, id) pair of the last row of the previous page. The
+    `page_key` column of each row is the key to pass back for the next page.
+    """
+    expr, direction = KEYSET_ORDERS[sort]
+    where, params = _filter_clauses(filters)
+    if after is not None:
+        clause, clause_params = _keyset_clause(sort, *after)
+        where.append(clause)
+        params.extend(clause_params)
+
+    cursor = get_db().cursor()
+    cursor.execute(f'''
+        SELECT {columns}, {expr.split(' ')[0]} AS page_key
+        FROM songs s
+        LEFT JOIN videos v ON s.video_id = v.id
+        WHERE {' AND '.join(where)}
+        ORDER BY {expr} {direction}, s.id {direction}
+        LIMIT ?
+    ''', params + [limit])
+    return cursor.fetchall()
+
+
+# --- Change feed ---
+
+def latest_change():
+    """seq of the newest entry of the change feed (0 when empty)."""
+    return get_db().execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+
+
+def get_changes(since, limit):
+    """The rows changed after `since`, read from the next `limit` feed entries.
+
+    Returns ({(table, row id): (seq, op)} for the last change of each row,
+    seq of the last entry read); a row changed several times shows up once.
+    """
+    cursor = get_db().execute('SELECT seq, table_name, row_id, op FROM changes WHERE seq > ? ORDER BY seq LIMIT ?',
+                              (since, limit))
+    changed = {}
+    last_seq = since
+    for seq, table, row_id, op in cursor:
+        # Re-insert so the dict stays in order of each row's last change
+        changed.pop((table, row_id), None)
+        changed[(table, row_id)] = (seq, op)
+        last_seq = seq
+    return changed, last_seq
@@ -0,0 +1,158 @@
+import numpy as np
+
+from app.db import FACET_COLUMNS, PEOPLE_ROLES, split_people, person_key, partial_name_matches
+from app.categories import categorize_video
+
+# SQLite's LIKE and NOCASE only fold ASCII letters
+_ASCII_LOWER = str.maketrans('ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz')
+
+# Filters matched on the exact value / as a substring, like _filter_clauses() does
+_EXACT_FILTERS = ('category', 'depth')
+_LIKE_FILTERS = ('style', 'era')
+_PEOPLE_FILTERS = {'composer': 'composer', 'performer': 'performer', 'person': None}
+
+_NO_POSITIONS = np.empty(0, dtype=np.int32)
+
+
+def _ascii_lower(value):
+    return value.translate(_ASCII_LOWER)
+
+
+def _category(row):
+    return row['category'] or categorize_video(row['video_title'], row['description'])
+
+
+class FacetIndex:
+    """Inverted index over the catalog rows for combined filters and facet counts.
+
+    Each facet column is stored as one integer code per row position (code 0
+    is the empty value) and each person as a sorted array of positions. A
+    filter set turns into one boolean mask per active filter, ANDed together;
+    the facet counts of a result are a bincount of the codes under its mask.
+    """
+
+    def __init__(self, rows):
+        self.size = len(rows)
+        self.positions = {row['id']: pos for pos, row in enumerate(rows)}
+
+        self.values = {}
+        self.code_of = {}
+        self.codes = {}
+        for facet, column in (('category', None), *FACET_COLUMNS.items()):
+            column_values = [_category(row) if column is None else row[column] for row in rows]
+            values = [''] + sorted({v for v in column_values if v})
+            code_of = {value: code for code, value in enumerate(values)}
+            self.values[facet] = values
+            self.code_of[facet] = code_of
+            self.codes[facet] = np.fromiter((code_of.get(v or '', 0) for v in column_values),
+                                            dtype=np.int32, count=self.size)
+
+        # The same few strings repeat across many rows: parse each one once
+        parsed = {None: ()}
+        postings = {}
+        for pos, row in enumerate(rows):
+            for column, role in PEOPLE_ROLES.items():
+                value = row[column]
+                keys = parsed.get(value)
+                if keys is None:
+                    keys = parsed[value] = {person_key(name) for name in split_people(value)}
+                for key in keys:
+                    postings.setdefault((role, key), []).append(pos)
+        for (role, key), positions in list(postings.items()):
+            postings.setdefault((None, key), []).extend(positions)
+        self.people = {k: np.unique(np.array(v, dtype=np.int32)) for k, v in postings.items()}
+        self.person_keys = sorted(key for role, key in self.people if role is None)
+
+        self.orders = {'date': self._order(rows, 'date'), 'alpha': self._order(rows, 'alpha')}
+
+    def _order(self, rows, sort):
+        """Row positions in the order SONG_ORDERS[sort] returns them."""
+        ids = [row['id'] for row in rows]
+        titles = [row['song_title'] for row in rows]
+        # NULL sorts first in SQLite, before any string
+        title_keys = [(t is not None, t or '') for t in titles]
+        if sort == 'alpha':
+            order = sorted(range(self.size), key=lambda p: (
+                title_keys[p][0], _ascii_lower(title_keys[p][1]), title_keys[p][1], ids[p]))
+        else:
+            order = sorted(range(self.size), key=lambda p: (title_keys[p], ids[p]))
+            # published_at DESC puts NULLs last; the stable sort keeps the tie order
+            dates = [row['published_at'] for row in rows]
+            order.sort(key=lambda p: (dates[p] is not None, dates[p] or ''), reverse=True)
+        return np.array(order, dtype=np.int32)
+
+    def _people_mask(self, value, role):
+        mask = np.zeros(self.size, dtype=bool)
+        keys = {person_key(name) for name in split_people(value)}
+        if keys:
+            mask[:] = True
+        for key in keys:
+            hits = np.zeros(self.size, dtype=bool)
+            if (None, key) in self.people:
+                matches = [key]
+            else:
+                # Not a full name: everyone it is part of, as _filter_clauses() does
+                matches = [k for k in self.person_keys if partial_name_matches(key, k)]
+            for match in matches:
+                hits[self.people.get((role, match), _NO_POSITIONS)] = True
+            mask &= hits
+        return mask
+
+    def filter_masks(self, filters, search_ids=()):
+        """One boolean mask per active filter; `search_ids` are the songs the search matched."""
+        masks = {}
+        if filters.get('search'):
+            mask = np.zeros(self.size, dtype=bool)
+            positions = [self.positions[i] for i in search_ids if i in self.positions]
+            mask[np.array(positions, dtype=np.int32)] = True
+            masks['search'] = mask
+        for name in _EXACT_FILTERS:
+            if filters.get(name):
+                masks[name] = self.codes[name] == self.code_of[name].get(filters[name], -1)
+        for name in _LIKE_FILTERS:
+            if filters.get(name):
+                pattern = _ascii_lower(filters[name])
+                table = np.array([bool(v) and pattern in _ascii_lower(v) for v in self.values[name]])
+                masks[name] = table[self.codes[name]]
+        for name, role in _PEOPLE_FILTERS.items():
+            if filters.get(name):
+                masks[name] = self._people_mask(filters[name], role)
+        return masks
+
+    def _combine(self, masks, skip=None):
+        mask = np.ones(self.size, dtype=bool)
+        for name, m in masks.items():
+            if name != skip:
+                mask &= m
+        return mask
+
+    def _positions_of(self, ids):
+        return np.array([self.positions[i] for i in ids if i in self.positions], dtype=np.int32)
+
+    def select(self, filters, sort='date', search_ids=(), fuzzy_ids=()):
+        """Positions of the rows matching `filters`, in `sort` order.
+
+        With a search, sort='relevance' keeps the order of `search_ids`; the
+        fuzzy matches `fuzzy_ids` follow the exact ones in their own order,
+        whatever the sort.
+        """
+        mask = self._combine(self.filter_masks(filters, [*search_ids, *fuzzy_ids]))
+        order = self.orders.get(sort, self.orders['date'])
+        if filters.get('search'):
+            exact = self._positions_of(search_ids)
+            if sort != 'relevance':
+                in_exact = np.zeros(self.size, dtype=bool)
+                in_exact[exact] = True
+                exact = order[in_exact[order]]
+            order = np.concatenate([exact, self._positions_of(fuzzy_ids)])
+        return order[mask[order]]
+
+    def counts(self, filters, search_ids=()):
+        """{facet: [(value, count), ...]} with every filter but the facet's own applied."""
+        masks = self.filter_masks(filters, search_ids)
+        facets = {}
+        for facet, codes in self.codes.items():
+            counts = np.bincount(codes[self._combine(masks, skip=facet)], minlength=len(self.values[facet]))
+            facets[facet] = [(self.values[facet][code], int(count))
+                             for code, count in enumerate(counts) if code and count]
+        return facets
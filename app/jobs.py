@@ -0,0 +1,220 @@
+import json
+import os
+import threading
+import time
+import traceback
+
+from flask import current_app
+
+from app.db import get_db
+from app.writer import write
+
+# kind -> function(job) returning the job's result (anything JSON)
+JOBS = {}
+
+JOB_COLUMNS = 'id, kind, params, status, progress, result, error, attempts, created_at, started_at, finished_at'
+
+# Seconds between purges of the finished jobs
+PURGE_INTERVAL = 3600
+
+
+def job(kind):
+    """Register the decorated function as the handler of `kind` jobs."""
+    def register(func):
+        JOBS[kind] = func
+        return func
+    return register
+
+
+class Job:
+    """A claimed job, as its handler sees it.
+
+    `progress` is what a previous run saved, so a job retried after its
+    worker died can pick up where it stopped.
+    """
+
+    def __init__(self, runner, row):
+        self.runner = runner
+        self.id = row['id']
+        self.kind = row['kind']
+        self.params = json.loads(row['params'])
+        self.progress = json.loads(row['progress']) if row['progress'] else {}
+
+    def save(self, func=None, **progress):
+        """Write func(db) and the job's progress in one transaction; return func's result.
+
+        Work done this way and the record that it was done can't disagree
+        after a crash. `func` may itself update self.progress.
+        """
+        def apply(db):
+            result = func(db) if func is not None else None
+            self.progress.update(progress)
+            db.execute('UPDATE jobs SET progress = ?, lease_until = ? WHERE id = ?',
+                       (json.dumps(self.progress), time.time() + self.runner.lease, self.id))
+            return result
+        return write(apply, catalog=func is not None)
+
+
+class JobRunner:
+    """Worker threads running the jobs queued in the `jobs` table.
+
+    A worker claims the oldest queued job with a lease of JOB_LEASE_SECONDS,
+    which a heartbeat thread renews while the job runs. If the process dies,
+    the lease runs out and any worker (in this process or another) runs the
+    job again, up to JOB_MAX_ATTEMPTS times. Handlers must therefore be safe
+    to re-run, using Job.save() to record what is already done. The
+    heartbeat thread also deletes the jobs finished more than
+    JOB_RETENTION_DAYS ago, once every PURGE_INTERVAL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.workers = app.config['JOB_WORKERS']
+        self.lease = app.config['JOB_LEASE_SECONDS']
+        self.max_attempts = app.config['JOB_MAX_ATTEMPTS']
+        self.poll_interval = app.config['JOB_POLL_INTERVAL']
+        self.retention_days = app.config['JOB_RETENTION_DAYS']
+        self._purged_at = 0
+        self._wake = threading.Event()
+        self._running = {}
+        self._threads = []
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self, workers=None):
+        # Started by the first request, and again in a forked worker (threads don't survive fork)
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._running = {}
+            count = self.workers if workers is None else workers
+            self._threads = [threading.Thread(target=self._work, name=f'job-worker-{n}', daemon=True)
+                             for n in range(count)]
+            if self._threads:
+                self._threads.append(threading.Thread(target=self._heartbeat, name='job-heartbeat', daemon=True))
+            for thread in self._threads:
+                thread.start()
+
+    def notify(self):
+        """Wake the workers: a job was just queued."""
+        self._wake.set()
+
+    def _work(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    row = self._claim()
+                    if row is not None:
+                        self._run(row)
+                        continue
+            except Exception as e:
+                print(f"[JOBS] Worker error: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def _claim(self):
+        now = time.time()
+        # Read first, so idle workers don't write to the database every poll
+        if get_db().execute("SELECT 1 FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                            "LIMIT 1", (now,)).fetchone() is None:
+            return None
+
+        def claim(db):
+            # A job whose lease ran out lost its worker; past the last attempt it fails instead of running again
+            db.execute('''
+                UPDATE jobs SET status = 'failed', error = 'Worker stopped during the last attempt',
+                                lease_until = NULL, finished_at = CURRENT_TIMESTAMP
+                WHERE status = 'running' AND lease_until < ? AND attempts >= ?
+            ''', (now, self.max_attempts))
+            return db.execute('''
+                UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_until = ?,
+                                started_at = COALESCE(started_at, CURRENT_TIMESTAMP)
+                WHERE id = (SELECT id FROM jobs
+                            WHERE status = 'queued' OR (status = 'running' AND lease_until < ?)
+                            ORDER BY id LIMIT 1)
+                RETURNING id, kind, params, progress
+            ''', (time.time() + self.lease, now)).fetchone()
+        return write(claim, catalog=False)
+
+    def _run(self, row):
+        job = Job(self, row)
+        self._running[threading.get_ident()] = job.id
+        print(f"[JOBS] Running {job.kind} job {job.id}")
+        try:
+            if job.kind not in JOBS:
+                raise LookupError(f'Unknown job kind {job.kind!r}')
+            result = JOBS[job.kind](job)
+        except Exception as e:
+            traceback.print_exc()
+            self._finish(job.id, 'failed', error=str(e))
+        else:
+            self._finish(job.id, 'done', result=json.dumps(result))
+        finally:
+            self._running.pop(threading.get_ident(), None)
+
+    def _finish(self, job_id, status, result=None, error=None):
+        write(lambda db: db.execute('''
+            UPDATE jobs SET status = ?, result = ?, error = ?, lease_until = NULL, finished_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, result, error, job_id)), catalog=False)
+        print(f"[JOBS] Job {job_id} {status}" + (f": {error}" if error else ''))
+
+    def _heartbeat(self):
+        while True:
+            time.sleep(self.lease / 3)
+            if time.time() - self._purged_at >= PURGE_INTERVAL:
+                self._purged_at = time.time()
+                try:
+                    with self.app.app_context():
+                        purged = purge_jobs(self.retention_days)
+                    if purged:
+                        print(f"[JOBS] Purged {purged} finished job(s)")
+                except Exception as e:
+                    print(f"[JOBS] Purge error: {e}")
+            job_ids = list(self._running.values())
+            if not job_ids:
+                continue
+            try:
+                with self.app.app_context():
+                    write(lambda db: db.executemany(
+                        "UPDATE jobs SET lease_until = ? WHERE id = ? AND status = 'running'",
+                        [(time.time() + self.lease, job_id) for job_id in job_ids]), catalog=False)
+            except Exception as e:
+                print(f"[JOBS] Heartbeat error: {e}")
+
+
+def enqueue(kind, **params):
+    """Queue a `kind` job and return its id; an identical job already waiting or running is reused."""
+    encoded = json.dumps(params, sort_keys=True)
+
+    def add(db):
+        row = db.execute("SELECT id FROM jobs WHERE kind = ? AND params = ? AND status IN ('queued', 'running')",
+                         (kind, encoded)).fetchone()
+        if row is not None:
+            return row[0]
+        return db.execute('INSERT INTO jobs (kind, params) VALUES (?, ?)', (kind, encoded)).lastrowid
+
+    job_id = write(add, catalog=False)
+    current_app.extensions['jobs'].notify()
+    return job_id
+
+
+def purge_jobs(days):
+    """Delete the done and failed jobs that finished more than `days` days ago; return how many."""
+    return write(lambda db: db.execute(
+        "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < datetime('now', ?)",
+        (f'-{days} days',)).rowcount, catalog=False)
+
+
+def get_job(job_id):
+    """The job as the status endpoint reports it, or None."""
+    row = get_db().execute(f'SELECT {JOB_COLUMNS} FROM jobs WHERE id = ?', (job_id,)).fetchone()
+    if row is None:
+        return None
+    job = dict(row)
+    for key in ('params', 'progress', 'result'):
+        job[key] = json.loads(job[key]) if job[key] else None
+    return job
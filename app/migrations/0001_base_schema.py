@@ -0,0 +1,51 @@
+"""videos and songs, with every column added ad hoc before migrations were versioned."""
+
+VIDEOS_COLUMNS = {
+    'thumbnail_url': 'TEXT',
+    'video_type': "TEXT DEFAULT 'uncategorized'",
+    'category': 'TEXT DEFAULT NULL',
+}
+
+SONGS_COLUMNS = {
+    'performer': 'TEXT', 'composition_year': 'INTEGER', 'songwriters': 'TEXT',
+    'original_artist': 'TEXT', 'featured_artists': 'TEXT', 'other_musicians': 'TEXT',
+    'style': 'TEXT', 'additional_info': 'TEXT', 'era': 'TEXT', 'data_source': 'TEXT',
+    'video_title': 'TEXT', 'video_url': 'TEXT', 'video_description': 'TEXT', 'published_at': 'TEXT',
+    'album': 'TEXT', 'record_label': 'TEXT', 'recording_year': 'INTEGER', 'context_notes': 'TEXT',
+    'deleted': 'INTEGER DEFAULT 0', 'category': 'TEXT DEFAULT NULL', 'analysis_depth': 'TEXT DEFAULT NULL',
+}
+
+
+def _add_missing_columns(db, table, columns):
+    existing = {row[1] for row in db.execute(f'PRAGMA table_info({table})')}
+    for column, definition in columns.items():
+        if column not in existing:
+            db.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+
+def upgrade(db):
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS videos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_id TEXT UNIQUE,
+            title TEXT,
+            description TEXT,
+            url TEXT,
+            published_at TEXT
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE IF NOT EXISTS songs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            video_id INTEGER,
+            song_title TEXT,
+            composer TEXT,
+            timestamp TEXT,
+            part_number INTEGER,
+            total_parts INTEGER,
+            FOREIGN KEY (video_id) REFERENCES videos(id)
+        )
+    ''')
+    # Databases from before versioning have some of these already
+    _add_missing_columns(db, 'videos', VIDEOS_COLUMNS)
+    _add_missing_columns(db, 'songs', SONGS_COLUMNS)
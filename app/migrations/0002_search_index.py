@@ -0,0 +1,39 @@
+"""songs_fts: the FTS5 index behind the search box, kept in sync by triggers."""
+
+COLUMNS = ('song_title', 'composer', 'performer', 'original_artist', 'style',
+           'era', 'album', 'record_label', 'video_title')
+
+
+def upgrade(db):
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'songs_fts'").fetchone():
+        return  # created by the old boot-time check
+
+    columns = ', '.join(COLUMNS)
+    new_values = ', '.join(f'new.{c}' for c in COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in COLUMNS)
+
+    # External-content table: the text lives in `songs`, FTS only stores the index
+    db.execute(f'''
+        CREATE VIRTUAL TABLE songs_fts USING fts5(
+            {columns},
+            content='songs', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_ai AFTER INSERT ON songs BEGIN
+            INSERT INTO songs_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_ad AFTER DELETE ON songs BEGIN
+            INSERT INTO songs_fts(songs_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_au AFTER UPDATE OF {columns} ON songs BEGIN
+            INSERT INTO songs_fts(songs_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO songs_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    ''')
+    db.execute("INSERT INTO songs_fts(songs_fts) VALUES ('rebuild')")
@@ -0,0 +1,14 @@
+"""Indexes used by the listing queries."""
+
+INDEXES = (
+    'CREATE INDEX IF NOT EXISTS idx_songs_video_id ON songs(video_id)',
+    'CREATE INDEX IF NOT EXISTS idx_songs_deleted ON songs(deleted)',
+    'CREATE INDEX IF NOT EXISTS idx_songs_published_at ON songs(published_at)',
+    'CREATE INDEX IF NOT EXISTS idx_songs_title_nocase ON songs(song_title COLLATE NOCASE)',
+    'CREATE INDEX IF NOT EXISTS idx_videos_published_at ON videos(published_at)',
+)
+
+
+def upgrade(db):
+    for statement in INDEXES:
+        db.execute(statement)
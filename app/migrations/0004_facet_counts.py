@@ -0,0 +1,72 @@
+"""facet_counts: per-facet value counts of the visible songs, kept current by triggers."""
+from app.categories import categorize_video
+
+# Facet name -> songs column
+COLUMNS = {'composer': 'composer', 'performer': 'performer', 'style': 'style',
+           'era': 'era', 'depth': 'analysis_depth'}
+
+
+def _facet_statements(row, delta):
+    """Trigger body adjusting facet_counts for one songs row image ('new' or 'old')."""
+    statements = []
+    for facet, column in COLUMNS.items():
+        if delta > 0:
+            statements.append(f'''
+            INSERT INTO facet_counts(facet, value, count)
+                SELECT '{facet}', {row}.{column}, 1
+                WHERE COALESCE({row}.deleted, 0) = 0 AND {row}.{column} <> ''
+                ON CONFLICT(facet, value) DO UPDATE SET count = count + 1;''')
+        else:
+            statements.append(f'''
+            UPDATE facet_counts SET count = count - 1
+                WHERE facet = '{facet}' AND value = {row}.{column} AND COALESCE({row}.deleted, 0) = 0;''')
+    if delta < 0:
+        statements.append("\n            DELETE FROM facet_counts WHERE count <= 0;")
+    return ''.join(statements)
+
+
+def upgrade(db):
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'facet_counts'").fetchone():
+        return  # created by the old boot-time check
+
+    db.execute('''
+        CREATE TABLE facet_counts (
+            facet TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (facet, value)
+        ) WITHOUT ROWID
+    ''')
+    columns = ', '.join(COLUMNS.values())
+    db.execute(f'''
+        CREATE TRIGGER facet_counts_ai AFTER INSERT ON songs BEGIN{_facet_statements('new', 1)}
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER facet_counts_ad AFTER DELETE ON songs BEGIN{_facet_statements('old', -1)}
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER facet_counts_au AFTER UPDATE OF {columns}, deleted ON songs BEGIN{_facet_statements('old', -1)}{_facet_statements('new', 1)}
+        END
+    ''')
+
+    for facet, column in COLUMNS.items():
+        db.execute(f'''
+            INSERT INTO facet_counts(facet, value, count)
+            SELECT '{facet}', {column}, COUNT(*) FROM songs
+            WHERE (deleted IS NULL OR deleted = 0) AND {column} <> ''
+            GROUP BY {column}
+        ''')
+    # The category falls back to keyword matching in Python, which triggers can't
+    # call: the app recounts it on writes, this is the first count
+    db.create_function('categorize_video', 2, categorize_video, deterministic=True)
+    db.execute('''
+        INSERT INTO facet_counts(facet, value, count)
+        SELECT 'category', COALESCE(s.category, v.category, categorize_video(v.title, v.description)) AS value,
+               COUNT(*)
+        FROM songs s
+        LEFT JOIN videos v ON s.video_id = v.id
+        WHERE (s.deleted IS NULL OR s.deleted = 0)
+        GROUP BY value
+    ''')
@@ -0,0 +1,81 @@
+"""people/song_people: one row per person, linked to songs by role, filled from the songs table.
+
+The name parsing is a copy of app.db's as of this version, so later
+changes there don't rewrite what this migration did.
+"""
+import json
+import re
+
+# songs column -> role stored in song_people
+ROLES = {'composer': 'composer', 'performer': 'performer',
+         'featured_artists': 'featured_artist', 'songwriters': 'songwriter',
+         'other_musicians': 'other_musician'}
+
+
+def _split_people(value):
+    """Names in a people field: a JSON list or comma-joined text."""
+    if not value:
+        return []
+    names = None
+    if value.lstrip().startswith('['):
+        try:
+            names = json.loads(value)
+        except ValueError:
+            pass
+    if not isinstance(names, list):
+        names = re.split(r'\s*[,;/]\s*', value)
+    result = []
+    for name in names:
+        if isinstance(name, dict):
+            name = name.get('name')
+        if isinstance(name, str):
+            name = re.sub(r'^(?:and|et)\s+', '', name.strip())
+            if name:
+                result.append(name)
+    return result
+
+
+def _link_people(db):
+    links = set()
+    names = {}
+    for row in db.execute(f"SELECT id, {', '.join(ROLES)} FROM songs").fetchall():
+        for position, (column, role) in enumerate(ROLES.items(), 1):
+            for name in _split_people(row[position]):
+                key = ' '.join(name.casefold().split())
+                names.setdefault(key, name)
+                links.add((row[0], key, role))
+    db.executemany('INSERT OR IGNORE INTO people (name, name_key) VALUES (?, ?)',
+                   [(name, key) for key, name in names.items()])
+    person_ids = dict(db.execute('SELECT name_key, id FROM people').fetchall())
+    db.executemany('INSERT OR IGNORE INTO song_people (song_id, person_id, role) VALUES (?, ?, ?)',
+                   [(song_id, person_ids[key], role) for song_id, key, role in links])
+
+
+def upgrade(db):
+    if db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'song_people'").fetchone():
+        return  # created by the old boot-time check
+
+    db.execute('''
+        CREATE TABLE people (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            name_key TEXT NOT NULL UNIQUE
+        )
+    ''')
+    db.execute('''
+        CREATE TABLE song_people (
+            song_id INTEGER NOT NULL,
+            person_id INTEGER NOT NULL,
+            role TEXT NOT NULL,
+            PRIMARY KEY (song_id, person_id, role),
+            FOREIGN KEY (song_id) REFERENCES songs(id),
+            FOREIGN KEY (person_id) REFERENCES people(id)
+        ) WITHOUT ROWID
+    ''')
+    db.execute('CREATE INDEX idx_song_people_person ON song_people(person_id, role, song_id)')
+    db.execute('''
+        CREATE TRIGGER song_people_ad AFTER DELETE ON songs BEGIN
+            DELETE FROM song_people WHERE song_id = old.id;
+        END
+    ''')
+    _link_people(db)
@@ -0,0 +1,124 @@
+"""Keep video text in `videos` only: drop the copies songs carried of the video title, URL and description.
+
+songs_fts still indexes the video title, now through the songs_search
+view, and triggers on `videos` reindex a video's songs when it is renamed.
+
+The copies had drifted: before dropping them, every song whose copy
+differs from its video (or whose video is gone, leaving the copy as the
+only one) is kept in song_video_text_archive, and the counts are printed.
+A missing (NULL) copy loses nothing and is not kept.
+"""
+
+SONG_COLUMNS = ('song_title', 'composer', 'performer', 'original_artist', 'style',
+                'era', 'album', 'record_label')
+COLUMNS = (*SONG_COLUMNS, 'video_title')
+
+# Rewriting most pages, so reclaim them afterwards
+VACUUM = True
+
+
+def _values(song, video):
+    """FTS column values for the `song` row image, with the title of the `video` row image."""
+    return ', '.join([f'{song}.{c}' for c in SONG_COLUMNS] + [video])
+
+
+# Archived column -> the videos column it copied
+COPIED = {'video_title': 'title', 'video_url': 'url', 'video_description': 'description'}
+
+
+def _archive(db):
+    """Keep the copies that are not the same as in `videos`; return {reason: song count}."""
+    db.execute('''
+        CREATE TABLE song_video_text_archive (
+            song_id INTEGER PRIMARY KEY,
+            video_id INTEGER,
+            video_title TEXT,
+            video_url TEXT,
+            video_description TEXT,
+            reason TEXT NOT NULL
+        )
+    ''')
+    differs = ' || '.join(f"CASE WHEN s.{column} IS NOT NULL AND s.{column} IS NOT v.{source} THEN '{column},' ELSE '' END"
+                          for column, source in COPIED.items())
+    db.execute(f'''
+        INSERT INTO song_video_text_archive (song_id, video_id, video_title, video_url, video_description, reason)
+        SELECT id, video_id, video_title, video_url, video_description, reason FROM (
+            SELECT s.id, s.video_id, s.video_title, s.video_url, s.video_description,
+                   CASE WHEN v.id IS NULL THEN 'orphan' ELSE rtrim({differs}, ',') END AS reason
+            FROM songs s LEFT JOIN videos v ON v.id = s.video_id
+        )
+        WHERE reason != '' AND (reason != 'orphan' OR COALESCE(video_title, video_url, video_description) IS NOT NULL)
+    ''')
+    counts = {'orphan': 0, **{column: 0 for column in COPIED}}
+    for (reason,) in db.execute('SELECT reason FROM song_video_text_archive'):
+        for part in reason.split(','):
+            counts[part] += 1
+    return counts
+
+
+def upgrade(db):
+    counts = _archive(db)
+    if any(counts.values()):
+        print(f"[MIGRATIONS] Kept the video text of songs whose copy differed in song_video_text_archive: "
+              f"{counts['video_title']} title(s), {counts['video_url']} URL(s), "
+              f"{counts['video_description']} description(s), {counts['orphan']} song(s) without a video")
+
+    for trigger in ('songs_fts_ai', 'songs_fts_ad', 'songs_fts_au'):
+        db.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    db.execute('DROP TABLE IF EXISTS songs_fts')
+    for column in ('video_title', 'video_url', 'video_description'):
+        db.execute(f'ALTER TABLE songs DROP COLUMN {column}')
+
+    song_columns = ', '.join(f's.{c}' for c in SONG_COLUMNS)
+    db.execute(f'''
+        CREATE VIEW songs_search AS
+        SELECT s.id, {song_columns}, v.title AS video_title
+        FROM songs s
+        LEFT JOIN videos v ON s.video_id = v.id
+    ''')
+
+    columns = ', '.join(COLUMNS)
+    # External content read through the view: the text lives in songs/videos, FTS only stores the index
+    db.execute(f'''
+        CREATE VIRTUAL TABLE songs_fts USING fts5(
+            {columns},
+            content='songs_search', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )
+    ''')
+    new_title = '(SELECT title FROM videos WHERE id = new.video_id)'
+    old_title = '(SELECT title FROM videos WHERE id = old.video_id)'
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_ai AFTER INSERT ON songs BEGIN
+            INSERT INTO songs_fts(rowid, {columns}) VALUES (new.id, {_values('new', new_title)});
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_ad AFTER DELETE ON songs BEGIN
+            INSERT INTO songs_fts(songs_fts, rowid, {columns}) VALUES ('delete', old.id, {_values('old', old_title)});
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_au AFTER UPDATE OF {', '.join(SONG_COLUMNS)}, video_id ON songs BEGIN
+            INSERT INTO songs_fts(songs_fts, rowid, {columns}) VALUES ('delete', old.id, {_values('old', old_title)});
+            INSERT INTO songs_fts(rowid, {columns}) VALUES (new.id, {_values('new', new_title)});
+        END
+    ''')
+    # A renamed or removed video changes the indexed text of all its songs
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_video_au AFTER UPDATE OF title ON videos BEGIN
+            INSERT INTO songs_fts(songs_fts, rowid, {columns})
+                SELECT 'delete', s.id, {_values('s', 'old.title')} FROM songs s WHERE s.video_id = old.id;
+            INSERT INTO songs_fts(rowid, {columns})
+                SELECT s.id, {_values('s', 'new.title')} FROM songs s WHERE s.video_id = new.id;
+        END
+    ''')
+    db.execute(f'''
+        CREATE TRIGGER songs_fts_video_ad AFTER DELETE ON videos BEGIN
+            INSERT INTO songs_fts(songs_fts, rowid, {columns})
+                SELECT 'delete', s.id, {_values('s', 'old.title')} FROM songs s WHERE s.video_id = old.id;
+            INSERT INTO songs_fts(rowid, {columns})
+                SELECT s.id, {_values('s', 'NULL')} FROM songs s WHERE s.video_id = old.id;
+        END
+    ''')
+    db.execute("INSERT INTO songs_fts(songs_fts) VALUES ('rebuild')")
@@ -0,0 +1,52 @@
+"""Change feed: `changes` logs every insert, update, (soft) delete and restore of songs and videos.
+
+seq only grows (AUTOINCREMENT never reuses a number), so a client that
+remembers the last seq it saw can ask for what changed since. Only keys
+are logged; /api/changes reads the current rows. Updates that change
+nothing (the auto-update upsert rewriting an unchanged video) are not
+logged. The WHEN clauses list the columns as of this migration, so a
+later migration adding a column must recreate the update trigger.
+"""
+
+TABLES = ('songs', 'videos')
+
+
+def _changed(db, table):
+    columns = [row[1] for row in db.execute(f'PRAGMA table_info({table})')]
+    return ' OR '.join(f'old.{c} IS NOT new.{c}' for c in columns)
+
+
+def upgrade(db):
+    db.execute('''
+        CREATE TABLE changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL,
+            changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    update_ops = {
+        # Soft deletes and restores flip songs.deleted
+        'songs': '''CASE WHEN COALESCE(new.deleted, 0) != 0 AND COALESCE(old.deleted, 0) = 0 THEN 'delete'
+                         WHEN COALESCE(new.deleted, 0) = 0 AND COALESCE(old.deleted, 0) != 0 THEN 'restore'
+                         ELSE 'update' END''',
+        'videos': "'update'",
+    }
+    for table in TABLES:
+        db.execute(f'''
+            CREATE TRIGGER changes_{table}_ai AFTER INSERT ON {table} BEGIN
+                INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', new.id, 'insert');
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER changes_{table}_au AFTER UPDATE ON {table} WHEN {_changed(db, table)} BEGIN
+                INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', new.id, {update_ops[table]});
+            END
+        ''')
+        db.execute(f'''
+            CREATE TRIGGER changes_{table}_ad AFTER DELETE ON {table} BEGIN
+                INSERT INTO changes (table_name, row_id, op) VALUES ('{table}', old.id, 'delete');
+            END
+        ''')
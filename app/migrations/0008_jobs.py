@@ -0,0 +1,21 @@
+"""jobs: the durable queue of background work (LLM extractions), see app.jobs."""
+
+
+def upgrade(db):
+    db.execute('''
+        CREATE TABLE jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            params TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'queued',
+            progress TEXT,
+            result TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            lease_until REAL,
+            created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            started_at TEXT,
+            finished_at TEXT
+        )
+    ''')
+    db.execute('CREATE INDEX idx_jobs_status ON jobs(status, id)')
@@ -0,0 +1,102 @@
+"""Versioned schema migrations.
+
+Each `NNNN_name.py` module in this package has an `upgrade(db)` function
+that takes the schema from version NNNN - 1 to NNNN (and sets
+`VACUUM = True` if the database should be compacted after it). The version a
+database is at is kept in `PRAGMA user_version`; the code declares the
+version it needs in SCHEMA_VERSION, so the startup check is one integer
+read and comparison. Apply pending migrations with `flask migrate` before
+deploying.
+"""
+import importlib
+import pkgutil
+import re
+
+from flask import abort
+
+_MODULE_NAME = re.compile(r'^(\d{4})_\w+$')
+
+# Schema version this code runs against: bump it with every new migration
+SCHEMA_VERSION = 8
+
+
+def migrations():
+    """[(version, module name)] of every migration, in order."""
+    found = []
+    for module in pkgutil.iter_modules(__path__):
+        match = _MODULE_NAME.match(module.name)
+        if match:
+            found.append((int(match.group(1)), module.name))
+    found.sort()
+    versions = [version for version, name in found]
+    if versions != list(range(1, len(found) + 1)):
+        raise RuntimeError(f'Migrations must be numbered 1..n without gaps, found {versions}')
+    if len(found) != SCHEMA_VERSION:
+        raise RuntimeError(f'SCHEMA_VERSION is {SCHEMA_VERSION} but there are {len(found)} migrations')
+    return found
+
+
+def latest_version():
+    return SCHEMA_VERSION
+
+
+def schema_version(db):
+    return db.execute('PRAGMA user_version').fetchone()[0]
+
+
+def pending(db, target=None):
+    """[(version, module name)] of the migrations not applied to `db` yet, up to `target` if given."""
+    current = schema_version(db)
+    return [(version, name) for version, name in migrations()
+            if version > current and (target is None or version <= target)]
+
+
+def migrate(db, log=print, target=None):
+    """Apply every pending migration (up to version `target`), each in its own transaction with its version bump."""
+    applied = []
+    for version, name in pending(db, target):
+        module = importlib.import_module(f'{__name__}.{name}')
+        db.execute('BEGIN')
+        try:
+            module.upgrade(db)
+            db.execute(f'PRAGMA user_version = {version}')
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        if getattr(module, 'VACUUM', False):
+            db.execute('VACUUM')
+        log(f"Applied migration {name}")
+        applied.append(name)
+    return applied
+
+
+def check_schema(app):
+    """At startup, refuse requests (503) until the database is at SCHEMA_VERSION.
+
+    This is a single PRAGMA user_version read; the migration modules are
+    not even listed. The app still starts, so `flask migrate` can run. Only
+    with MIGRATE_ON_STARTUP set (e.g. for a local copy) does startup apply
+    the migrations itself.
+    """
+    from app.db import get_db
+
+    latest = latest_version()
+    with app.app_context():
+        db = get_db()
+        if schema_version(db) >= latest:
+            return
+        if app.config['MIGRATE_ON_STARTUP']:
+            migrate(db)
+            return
+        print(f"[MIGRATIONS] Schema at version {schema_version(db)}, the code needs {latest}: "
+              f"run `flask migrate`")
+
+    state = {'behind': True}
+
+    @app.before_request
+    def require_current_schema():
+        if state['behind']:
+            state['behind'] = schema_version(get_db()) < latest
+            if state['behind']:
+                abort(503, 'Database migrations pending')
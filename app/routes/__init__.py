@@ -1,9 +1,11 @@
 from app.routes.main import main_bp
 from app.routes.auth import auth_bp
 from app.routes.api import api_bp
+from app.routes.assets import assets_bp
 
 
 def register_blueprints(app):
     app.register_blueprint(main_bp)
     app.register_blueprint(auth_bp)
     app.register_blueprint(api_bp)
+    app.register_blueprint(assets_bp)
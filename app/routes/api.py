@@ -1,25 +1,40 @@
+import base64
 import json
 import os
 import re
-import sqlite3
 import html
 import time
 import requests
 from datetime import datetime
-from flask import Blueprint, request, session, jsonify, current_app, redirect
+from flask import Blueprint, request, session, jsonify, current_app, redirect, url_for
 
 import google_auth_oauthlib.flow
 import google.oauth2.credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
-from app.db import get_db
+from app.db import (get_db, refresh_category_facet, song_filters, sync_song_people, PEOPLE_ROLES,
+                    query_songs_page, KEYSET_ORDERS, CATEGORY_EXPR, latest_change, get_changes)
+from app.catalog import get_catalog, timestamp_url
+from app.suggest import SUGGEST_FIELDS, MAX_SUGGESTIONS
+from app.jobs import enqueue, get_job, job
+from app.thumbnails import schedule_thumbnails
+from app.writer import WriteQueueFull, before_commit, write
 
 api_bp = Blueprint('api', __name__)
 
 
 # --- Song CRUD ---
 
+# Fields the inline editor may change, per table
+SONG_FIELDS = ('song_title', 'composer', 'performer', 'original_artist',
+               'composition_year', 'style', 'era', 'additional_info',
+               'album', 'record_label', 'recording_year', 'context_notes',
+               'analysis_depth', 'category')
+VIDEO_FIELDS = ('category',)
+BATCH_UPDATE_MAX = 500
+
+
 @api_bp.route('/api/update_song', methods=['POST'])
 def update_song():
     if not session.get('admin'):
@@ -30,26 +45,22 @@ def update_song():
     field = data.get('field')
     value = data.get('value')
 
-    allowed_fields = ['song_title', 'composer', 'performer', 'original_artist',
-                     'composition_year', 'style', 'era', 'additional_info',
-                     'album', 'record_label', 'recording_year', 'context_notes',
-                     'analysis_depth']
-    if field not in allowed_fields:
+    if field not in SONG_FIELDS or field == 'category':
         return jsonify({'success': False, 'error': 'Invalid field'}), 400
 
+    def apply(db):
+        cursor = db.execute(f'UPDATE songs SET {field} = ? WHERE id = ?', (value, song_id))
+        if field in PEOPLE_ROLES:
+            sync_song_people([song_id])
+        return cursor.rowcount
+
     try:
         print(f"[UPDATE] Updating song {song_id}: {field} = '{value}'")
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute(f'UPDATE songs SET {field} = ? WHERE id = ?', (value, song_id))
-        rows_affected = cursor.rowcount
-        db.commit()
+        rows_affected = write(apply)
         print(f"[UPDATE] Success! {rows_affected} row(s) updated")
         return jsonify({'success': True})
-    except sqlite3.OperationalError as e:
-        if 'locked' in str(e):
-            return jsonify({'success': False, 'error': 'Database is locked. Please try again later.'}), 503
-        return jsonify({'success': False, 'error': str(e)}), 500
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -67,15 +78,73 @@ def update_category():
     if not item_id or not category:
         return jsonify({'success': False, 'error': 'Missing parameters'}), 400
 
+    table = 'videos' if view == 'videos' else 'songs'
+
+    def apply(db):
+        db.execute(f'UPDATE {table} SET category = ? WHERE id = ?', (category, item_id))
+        before_commit(refresh_category_facet)
+
     try:
-        db = get_db()
-        cursor = db.cursor()
-        if view == 'videos':
-            cursor.execute('UPDATE videos SET category = ? WHERE id = ?', (category, item_id))
-        else:
-            cursor.execute('UPDATE songs SET category = ? WHERE id = ?', (category, item_id))
-        db.commit()
+        write(apply)
         return jsonify({'success': True})
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/api/batch_update', methods=['POST'])
+def batch_update():
+    """Apply a list of {song_id|video_id, field, value} edits in one transaction: all or none."""
+    if not session.get('admin'):
+        return jsonify({'success': False, 'error': 'Unauthorized'}), 401
+
+    operations = (request.get_json(silent=True) or {}).get('operations')
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'error': 'Missing operations'}), 400
+    if len(operations) > BATCH_UPDATE_MAX:
+        return jsonify({'success': False, 'error': f'At most {BATCH_UPDATE_MAX} operations per batch'}), 400
+
+    updates = []
+    for i, op in enumerate(operations):
+        error = None
+        if not isinstance(op, dict):
+            error = 'not an object'
+        elif op.get('song_id') is not None:
+            table, item_id, fields = 'songs', op['song_id'], SONG_FIELDS
+        elif op.get('video_id') is not None:
+            table, item_id, fields = 'videos', op['video_id'], VIDEO_FIELDS
+        else:
+            error = 'missing song_id or video_id'
+        if error is None:
+            field, value = op.get('field'), op.get('value')
+            if field not in fields:
+                error = f'invalid field {field!r}'
+            elif field == 'category' and not value:
+                error = 'missing category'
+            elif value is not None and not isinstance(value, (str, int, float)):
+                error = 'invalid value'
+        if error:
+            return jsonify({'success': False, 'error': f'Operation {i}: {error}'}), 400
+        updates.append((table, item_id, field, value))
+
+    def apply(db):
+        rows_affected = 0
+        for table, item_id, field, value in updates:
+            rows_affected += db.execute(f'UPDATE {table} SET {field} = ? WHERE id = ?', (value, item_id)).rowcount
+        people = {item_id for table, item_id, field, value in updates if field in PEOPLE_ROLES}
+        if people:
+            sync_song_people(people)
+        if any(field == 'category' for table, item_id, field, value in updates):
+            before_commit(refresh_category_facet)
+        return rows_affected
+
+    try:
+        rows_affected = write(apply)
+        print(f"[UPDATE] Batch of {len(updates)} edit(s): {rows_affected} row(s) updated")
+        return jsonify({'success': True, 'updated': rows_affected})
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -90,11 +159,15 @@ def delete_song():
     if not song_id:
         return jsonify({'success': False, 'error': 'Missing song_id'}), 400
 
-    try:
-        db = get_db()
+    def apply(db):
         db.execute('UPDATE songs SET deleted = 1 WHERE id = ?', (song_id,))
-        db.commit()
+        before_commit(refresh_category_facet)
+
+    try:
+        write(apply)
         return jsonify({'success': True})
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -109,11 +182,15 @@ def restore_song():
     if not song_id:
         return jsonify({'success': False, 'error': 'Missing song_id'}), 400
 
-    try:
-        db = get_db()
+    def apply(db):
         db.execute('UPDATE songs SET deleted = 0 WHERE id = ?', (song_id,))
-        db.commit()
+        before_commit(refresh_category_facet)
+
+    try:
+        write(apply)
         return jsonify({'success': True})
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -130,27 +207,191 @@ def create_song():
     if not video_id or not song_title:
         return jsonify({'success': False, 'error': 'Missing video_id or song_title'}), 400
 
-    try:
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute('''
-            SELECT id, title, description, url, thumbnail_url, published_at
-            FROM videos WHERE id = ?
-        ''', (video_id,))
-        video = cursor.fetchone()
+    def apply(db):
+        video = db.execute('SELECT id, published_at FROM videos WHERE id = ?', (video_id,)).fetchone()
         if not video:
+            return None
+        cursor = db.execute('''
+            INSERT INTO songs (video_id, song_title, published_at, part_number, total_parts, deleted)
+            VALUES (?, ?, ?, 1, 1, 0)
+        ''', (video['id'], song_title, video['published_at']))
+        before_commit(refresh_category_facet)
+        return cursor.lastrowid
+
+    try:
+        new_song_id = write(apply)
+        if new_song_id is None:
             return jsonify({'success': False, 'error': 'Video not found'}), 404
+        return jsonify({'success': True, 'song_id': new_song_id})
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        cursor.execute('''
-            INSERT INTO songs (
-                video_id, song_title, video_title, video_url,
-                video_description, published_at, part_number, total_parts, deleted
-            ) VALUES (?, ?, ?, ?, ?, ?, 1, 1, 0)
-        ''', (video[0], song_title, video[1], video[3], video[2], video[5]))
 
-        new_song_id = cursor.lastrowid
-        db.commit()
-        return jsonify({'success': True, 'song_id': new_song_id})
+# --- Catalog API ---
+
+@api_bp.route('/api/facets', methods=['GET'])
+def facets():
+    """Per-option song counts for the filter dropdowns, given the current selection."""
+    try:
+        counts = get_catalog().facet_counts(song_filters(request.args))
+        return jsonify({
+            'success': True,
+            'facets': {facet: [{'value': value, 'count': count} for value, count in values]
+                       for facet, values in counts.items()}
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/api/index/<letter>', methods=['GET'])
+def index_letter_songs(letter):
+    """One letter of the Real Book (`#` for titles not starting with a letter), optionally by `depth`."""
+    entries = get_catalog().index_buckets.get(letter.upper(), ())
+    depth = request.args.get('depth', 'all')
+    if depth != 'all':
+        entries = [s for s in entries if s['analysis_depth'] == depth]
+    return jsonify({'success': True, 'letter': letter.upper(), 'songs': [dict(s) for s in entries]})
+
+
+@api_bp.route('/api/suggest', methods=['GET'])
+def suggest():
+    """Typeahead: values of `field` (title, composer, performer, album or all) starting with `q`."""
+    field = request.args.get('field', 'all')
+    if field != 'all' and field not in SUGGEST_FIELDS:
+        return jsonify({'success': False, 'error': 'Invalid field'}), 400
+    try:
+        limit = max(1, min(int(request.args.get('limit', 10)), MAX_SUGGESTIONS))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid limit'}), 400
+
+    suggestions = get_catalog().suggestions.suggest(field, request.args.get('q', ''), limit)
+    return jsonify({
+        'success': True,
+        'suggestions': [{'value': value, 'count': count} for value, count in suggestions]
+    })
+
+
+API_SONG_COLUMNS = f'''
+    s.id, s.video_id, s.song_title, s.composer, s.performer, s.original_artist,
+    s.composition_year, s.style, s.era, s.album, s.record_label, s.recording_year,
+    s.analysis_depth, s.part_number, s.total_parts, s.timestamp, s.published_at,
+    v.title AS video_title, v.url AS video_url, v.thumbnail_url, {CATEGORY_EXPR} AS category
+'''
+
+
+VIDEO_CHANGE_COLUMNS = 'id, video_id, title, description, url, published_at, thumbnail_url, video_type, category'
+
+
+def _api_song(row):
+    """A song row selected with API_SONG_COLUMNS, as the API returns it."""
+    song = {k: row[k] for k in row.keys() if k not in ('page_key', 'timestamp', 'video_url')}
+    song['url'] = timestamp_url(row['video_url'], row['timestamp'])
+    return song
+
+
+def _encode_cursor(sort, key, song_id):
+    raw = json.dumps([sort, key, song_id], ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, sort):
+    """Return the (key, id) pair encoded in `cursor`; ValueError if it is not one of ours."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        cursor_sort, key, song_id = json.loads(raw)
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if cursor_sort != sort or not isinstance(song_id, int) or not (key is None or isinstance(key, str)):
+        raise ValueError('Invalid cursor')
+    return key, song_id
+
+
+@api_bp.route('/api/songs', methods=['GET'])
+def list_songs():
+    """Keyset-paginated catalog, filtered like the index page.
+
+    Pass `cursor` from the previous response to get the next page; `limit`
+    sets the page size (capped by API_MAX_PAGE_SIZE).
+    """
+    sort = request.args.get('sort', 'date')
+    if sort not in KEYSET_ORDERS:
+        return jsonify({'success': False, 'error': 'Invalid sort'}), 400
+
+    try:
+        limit = int(request.args.get('limit', current_app.config['API_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid limit'}), 400
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+    after = None
+    if request.args.get('cursor'):
+        try:
+            after = _decode_cursor(request.args['cursor'], sort)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+    try:
+        # Read first: changes made while the page is read are replayed by /api/changes
+        change_seq = latest_change()
+        # One extra row tells whether there is a next page
+        rows = query_songs_page(song_filters(request.args), sort, after, limit + 1, API_SONG_COLUMNS)
+        page = rows[:limit]
+        next_cursor = None
+        if len(rows) > limit:
+            next_cursor = _encode_cursor(sort, page[-1]['page_key'], page[-1]['id'])
+        return jsonify({'success': True, 'songs': [_api_song(row) for row in page], 'next_cursor': next_cursor,
+                        'change_seq': change_seq})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@api_bp.route('/api/changes', methods=['GET'])
+def changes():
+    """What changed in songs and videos after feed entry `since`.
+
+    One delta per changed row, {seq, table, id, op, row}: `row` is the row
+    as it is now (shaped like /api/songs for songs), or null if it is
+    deleted. Pass `next` back as `since` until `more` is false. Start from
+    the `change_seq` of a full /api/songs fetch; `reset` means the feed is
+    behind `since` (the database was replaced) and the client must refetch.
+    """
+    try:
+        since = int(request.args.get('since', 0))
+        limit = int(request.args.get('limit', current_app.config['API_MAX_PAGE_SIZE']))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid since or limit'}), 400
+    if since < 0:
+        return jsonify({'success': False, 'error': 'Invalid since'}), 400
+    limit = max(1, min(limit, current_app.config['API_MAX_PAGE_SIZE']))
+
+    try:
+        db = get_db()
+        latest = latest_change()
+        if since > latest:
+            return jsonify({'success': True, 'reset': True, 'changes': [], 'next': latest, 'more': False})
+        changed, next_seq = get_changes(since, limit)
+
+        rows = {}
+        song_ids = [row_id for table, row_id in changed if table == 'songs']
+        video_ids = [row_id for table, row_id in changed if table == 'videos']
+        if song_ids:
+            placeholders = ','.join('?' * len(song_ids))
+            for row in db.execute(f'''
+                SELECT {API_SONG_COLUMNS} FROM songs s LEFT JOIN videos v ON s.video_id = v.id
+                WHERE s.id IN ({placeholders}) AND (s.deleted IS NULL OR s.deleted = 0)
+            ''', song_ids):
+                rows[('songs', row['id'])] = _api_song(row)
+        if video_ids:
+            placeholders = ','.join('?' * len(video_ids))
+            for row in db.execute(f'SELECT {VIDEO_CHANGE_COLUMNS} FROM videos WHERE id IN ({placeholders})', video_ids):
+                rows[('videos', row['id'])] = dict(row)
+
+        deltas = [{'seq': seq, 'table': table, 'id': row_id, 'op': op, 'row': rows.get((table, row_id))}
+                  for (table, row_id), (seq, op) in changed.items()]
+        return jsonify({'success': True, 'reset': False, 'changes': deltas, 'next': next_seq,
+                        'more': next_seq < latest_change()})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
@@ -178,7 +419,7 @@ def get_master_prompt():
 
 @api_bp.route('/api/enrich_video', methods=['POST'])
 def enrich_video():
-    """Extract songs from a video using LLM."""
+    """Queue the LLM extraction of a video's songs; poll /api/jobs/<job_id> for the outcome."""
     if not session.get('admin'):
         return jsonify({'success': False, 'error': 'Unauthorized'}), 401
 
@@ -188,51 +429,61 @@ def enrich_video():
         return jsonify({'success': False, 'error': 'Missing video_id'}), 400
 
     try:
-        db = get_db()
-        cursor = db.cursor()
-        cursor.execute('SELECT title, description, url FROM videos WHERE id = ?', (video_id,))
-        video = cursor.fetchone()
-        if not video:
+        if not get_db().execute('SELECT 1 FROM videos WHERE id = ?', (video_id,)).fetchone():
             return jsonify({'success': False, 'error': 'Video not found'}), 404
-
-        video_title, video_description, video_url = video
-
-        print(f"[ENRICH] Extracting songs from: {video_title}")
-        songs = _extract_video_data(video_title, video_description, video_url)
-
-        cursor.execute('DELETE FROM songs WHERE video_id = ?', (video_id,))
-
-        for song in songs:
-            cursor.execute('''
-                INSERT INTO songs (
-                    video_id, song_title, composer, performer, original_artist,
-                    album, record_label, recording_year, composition_year,
-                    style, era, featured_artists, context_notes, timestamp,
-                    part_number, total_parts, video_title, video_url,
-                    video_description, published_at
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                video_id, song.get('song_title'), song.get('composer'),
-                song.get('performer'), song.get('original_artist'),
-                song.get('album'), song.get('record_label'),
-                song.get('recording_year'), song.get('composition_year'),
-                song.get('style'), song.get('era'),
-                ', '.join(song.get('featured_artists', [])) if song.get('featured_artists') else None,
-                song.get('context_notes'), song.get('timestamp'),
-                song.get('part_number', 1), song.get('total_parts', 1),
-                video_title, video_url, video_description, None
-            ))
-
-        db.commit()
-        print(f"[ENRICH] Extracted {len(songs)} song(s)")
-        return jsonify({'success': True, 'songs_count': len(songs)})
+        return _job_accepted(enqueue('enrich_video', video_id=video_id))
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
     except Exception as e:
-        print(f"[ENRICH] Error: {e}")
-        import traceback
-        traceback.print_exc()
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@job('enrich_video')
+def _enrich_video_job(job):
+    video_id = job.params['video_id']
+    video = get_db().execute('SELECT title, description, url FROM videos WHERE id = ?', (video_id,)).fetchone()
+    if not video:
+        raise LookupError('Video not found')
+
+    video_title, video_description, video_url = video
+    print(f"[ENRICH] Extracting songs from: {video_title}")
+    songs = _extract_video_data(video_title, video_description, video_url)
+
+    # Replacing the songs is idempotent, so a retried job just redoes it
+    job.save(lambda db: _replace_video_songs(db, video_id, songs), songs_count=len(songs))
+    print(f"[ENRICH] Extracted {len(songs)} song(s)")
+    return {'songs_count': len(songs)}
+
+
+def _replace_video_songs(db, video_id, songs):
+    """Write: swap a video's songs for freshly extracted ones."""
+    db.execute('DELETE FROM songs WHERE video_id = ?', (video_id,))
+
+    song_ids = []
+    for song in songs:
+        cursor = db.execute('''
+            INSERT INTO songs (
+                video_id, song_title, composer, performer, original_artist,
+                album, record_label, recording_year, composition_year,
+                style, era, featured_artists, context_notes, timestamp,
+                part_number, total_parts, published_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            video_id, song.get('song_title'), song.get('composer'),
+            song.get('performer'), song.get('original_artist'),
+            song.get('album'), song.get('record_label'),
+            song.get('recording_year'), song.get('composition_year'),
+            song.get('style'), song.get('era'),
+            ', '.join(song.get('featured_artists', [])) if song.get('featured_artists') else None,
+            song.get('context_notes'), song.get('timestamp'),
+            song.get('part_number', 1), song.get('total_parts', 1), None
+        ))
+        song_ids.append(cursor.lastrowid)
+
+    sync_song_people(song_ids)
+    before_commit(refresh_category_facet)
+
+
 # --- Changelog / Notifications ---
 
 @api_bp.route('/api/get_changelog', methods=['GET'])
@@ -297,117 +548,166 @@ def mark_changelog_seen():
 
 @api_bp.route('/api/auto_update', methods=['POST'])
 def auto_update():
-    """Scrape YouTube for latest videos, extract songs from new ones."""
+    """Queue a scrape of the YouTube channel that extracts songs from new videos; poll /api/jobs/<job_id>."""
+    if not current_app.config.get('YOUTUBE_API_KEY') or not current_app.config.get('OPENAI_API_KEY'):
+        return jsonify({'success': False, 'error': 'API keys not configured'}), 500
+
     try:
-        youtube_api_key = current_app.config.get('YOUTUBE_API_KEY')
-        openai_api_key = current_app.config.get('OPENAI_API_KEY')
+        return _job_accepted(enqueue('auto_update'))
+    except WriteQueueFull as e:
+        return jsonify({'success': False, 'error': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        if not youtube_api_key or not openai_api_key:
-            return jsonify({'success': False, 'error': 'API keys not configured'}), 500
 
-        db = get_db()
-        cursor = db.cursor()
+@job('auto_update')
+def _auto_update_job(job):
+    if 'pending' not in job.progress:
+        fetched = _fetch_channel_videos(current_app.config['YOUTUBE_API_KEY'])
+
+        # The new videos are recorded with the upsert: on a retry they are no longer new
+        def upsert(db):
+            new_videos, new_thumbnails = _upsert_videos(db, fetched) if fetched else ([], [])
+            job.progress.update(new_videos=len(new_videos), new_songs=0,
+                                pending=[video['id'] for video in new_videos])
+            return new_thumbnails
+        schedule_thumbnails(job.save(upsert))
+
+    # One short write per video, after its LLM call, which also marks the video done
+    for video_id in list(job.progress['pending']):
+        video = get_db().execute('SELECT id, title, description, url FROM videos WHERE id = ?', (video_id,)).fetchone()
+        songs = _extract_video_data(video['title'], video['description'] or '', video['url']) if video else []
+
+        def store(db):
+            if songs:
+                _insert_extracted_songs(db, dict(video), songs)
+            job.progress['pending'].remove(video_id)
+            job.progress['new_songs'] += len(songs)
+        job.save(store)
+
+    new_videos, new_songs_count = job.progress['new_videos'], job.progress['new_songs']
+    return {
+        'new_videos': new_videos,
+        'new_songs': new_songs_count,
+        'message': f'Found {new_videos} new video(s), extracted {new_songs_count} song(s)'
+    }
 
-        channel_handle = 'Pianojazzconcept'
-        search_resp = requests.get('https://www.googleapis.com/youtube/v3/search', params={
-            'key': youtube_api_key, 'q': channel_handle, 'type': 'channel', 'part': 'snippet'
-        }).json()
 
-        if 'items' not in search_resp or len(search_resp['items']) == 0:
-            return jsonify({'success': False, 'error': 'Channel not found'}), 404
+def _fetch_channel_videos(youtube_api_key):
+    """(video_id, title, description, url, published_at, thumbnail_url) of the channel's latest 50 videos."""
+    channel_handle = 'Pianojazzconcept'
+    search_resp = requests.get('https://www.googleapis.com/youtube/v3/search', params={
+        'key': youtube_api_key, 'q': channel_handle, 'type': 'channel', 'part': 'snippet'
+    }).json()
 
-        channel_id = search_resp['items'][0]['id']['channelId']
+    if 'items' not in search_resp or len(search_resp['items']) == 0:
+        raise LookupError('Channel not found')
 
-        cursor.execute('SELECT video_id FROM videos')
-        existing_video_ids = set(row[0] for row in cursor.fetchall())
+    channel_id = search_resp['items'][0]['id']['channelId']
 
-        new_videos = []
-        videos_to_extract = []
+    fetched = []
 
-        response = requests.get('https://www.googleapis.com/youtube/v3/search', params={
-            'key': youtube_api_key, 'channelId': channel_id,
-            'part': 'snippet', 'type': 'video', 'maxResults': 50, 'order': 'date'
-        }).json()
+    response = requests.get('https://www.googleapis.com/youtube/v3/search', params={
+        'key': youtube_api_key, 'channelId': channel_id,
+        'part': 'snippet', 'type': 'video', 'maxResults': 50, 'order': 'date'
+    }).json()
 
-        video_ids = [item['id']['videoId'] for item in response.get('items', [])]
+    video_ids = [item['id']['videoId'] for item in response.get('items', [])]
 
-        if video_ids:
-            details_response = requests.get('https://www.googleapis.com/youtube/v3/videos', params={
-                'key': youtube_api_key, 'id': ','.join(video_ids), 'part': 'snippet'
-            }).json()
-
-            for item in details_response.get('items', []):
-                video_id = item['id']
-                title = html.unescape(item['snippet']['title'])
-                description = html.unescape(item['snippet']['description'])
-                url = f"https://youtube.com/watch?v={video_id}"
-                published_at = item['snippet']['publishedAt']
-
-                thumbnails = item['snippet']['thumbnails']
-                thumbnail_url = (thumbnails.get('maxres') or thumbnails.get('high') or
-                               thumbnails.get('medium') or thumbnails.get('default'))['url']
-
-                is_new = video_id not in existing_video_ids
-
-                cursor.execute('''
-                    INSERT OR REPLACE INTO videos (video_id, title, description, url, published_at, thumbnail_url)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (video_id, title, description, url, published_at, thumbnail_url))
-
-                db_video_id = cursor.lastrowid
-
-                if is_new:
-                    vid_data = {'id': db_video_id, 'video_id': video_id,
-                               'title': title, 'description': description, 'url': url}
-                    new_videos.append(vid_data)
-                    videos_to_extract.append(vid_data)
-
-        db.commit()
-
-        new_songs_count = 0
-        if videos_to_extract:
-            for video in videos_to_extract:
-                songs = _extract_video_data(video['title'], video['description'] or '', video['url'])
-                if songs:
-                    for song_idx, song in enumerate(songs, 1):
-                        featured_artists = song.get('featured_artists')
-                        if isinstance(featured_artists, list):
-                            featured_artists = json.dumps(featured_artists)
-
-                        cursor.execute('''
-                            INSERT INTO songs (
-                                video_id, song_title, composer, performer,
-                                original_artist, timestamp, composition_year,
-                                style, era, additional_info,
-                                part_number, total_parts,
-                                album, record_label, recording_year,
-                                featured_artists, context_notes,
-                                video_title, video_url, video_description, published_at
-                            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                        ''', (
-                            video['id'], song.get('song_title', video['title']),
-                            song.get('composer'), song.get('performer'),
-                            song.get('original_artist'), song.get('timestamp'),
-                            song.get('composition_year'), song.get('style'),
-                            song.get('era'), song.get('additional_info'),
-                            song_idx, len(songs),
-                            song.get('album'), song.get('record_label'),
-                            song.get('recording_year'), featured_artists,
-                            song.get('context_notes'), video['title'],
-                            video['url'], video['description'], None
-                        ))
-                    new_songs_count += len(songs)
-
-        db.commit()
+    if video_ids:
+        details_response = requests.get('https://www.googleapis.com/youtube/v3/videos', params={
+            'key': youtube_api_key, 'id': ','.join(video_ids), 'part': 'snippet'
+        }).json()
 
-        return jsonify({
-            'success': True,
-            'new_videos': len(new_videos),
-            'new_songs': new_songs_count,
-            'message': f'Found {len(new_videos)} new video(s), extracted {new_songs_count} song(s)'
-        })
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
+        for item in details_response.get('items', []):
+            video_id = item['id']
+            title = html.unescape(item['snippet']['title'])
+            description = html.unescape(item['snippet']['description'])
+            url = f"https://youtube.com/watch?v={video_id}"
+            published_at = item['snippet']['publishedAt']
+
+            thumbnails = item['snippet']['thumbnails']
+            thumbnail_url = (thumbnails.get('maxres') or thumbnails.get('high') or
+                           thumbnails.get('medium') or thumbnails.get('default'))['url']
+
+            fetched.append((video_id, title, description, url, published_at, thumbnail_url))
+    return fetched
+
+
+def _upsert_videos(db, fetched):
+    """Write: store the (video_id, title, description, url, published_at, thumbnail_url) rows.
+
+    Returns (the new videos, ids of the videos whose thumbnail_url changed).
+    """
+    new_videos = []
+    new_thumbnails = []
+    for video_id, title, description, url, published_at, thumbnail_url in fetched:
+        known = db.execute('SELECT thumbnail_url FROM videos WHERE video_id = ?', (video_id,)).fetchone()
+        # Upsert in place: REPLACE would give the video a new id and orphan its songs
+        row_id = db.execute('''
+            INSERT INTO videos (video_id, title, description, url, published_at, thumbnail_url)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(video_id) DO UPDATE SET
+                title = excluded.title, description = excluded.description, url = excluded.url,
+                published_at = excluded.published_at, thumbnail_url = excluded.thumbnail_url
+            RETURNING id
+        ''', (video_id, title, description, url, published_at, thumbnail_url)).fetchone()[0]
+        if known is None:
+            new_videos.append({'id': row_id, 'video_id': video_id,
+                               'title': title, 'description': description, 'url': url})
+        if thumbnail_url and (known is None or known[0] != thumbnail_url):
+            new_thumbnails.append(row_id)
+    return new_videos, new_thumbnails
+
+
+def _insert_extracted_songs(db, video, songs):
+    """Write: add the songs auto_update extracted from a new video."""
+    song_ids = []
+    for song_idx, song in enumerate(songs, 1):
+        featured_artists = song.get('featured_artists')
+        if isinstance(featured_artists, list):
+            featured_artists = json.dumps(featured_artists)
+
+        cursor = db.execute('''
+            INSERT INTO songs (
+                video_id, song_title, composer, performer,
+                original_artist, timestamp, composition_year,
+                style, era, additional_info,
+                part_number, total_parts,
+                album, record_label, recording_year,
+                featured_artists, context_notes, published_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            video['id'], song.get('song_title', video['title']),
+            song.get('composer'), song.get('performer'),
+            song.get('original_artist'), song.get('timestamp'),
+            song.get('composition_year'), song.get('style'),
+            song.get('era'), song.get('additional_info'),
+            song_idx, len(songs),
+            song.get('album'), song.get('record_label'),
+            song.get('recording_year'), featured_artists,
+            song.get('context_notes'), None
+        ))
+        song_ids.append(cursor.lastrowid)
+
+    sync_song_people(song_ids)
+    before_commit(refresh_category_facet)
+
+
+# --- Background jobs ---
+
+def _job_accepted(job_id):
+    return jsonify({'success': True, 'job_id': job_id,
+                    'status_url': url_for('api.job_status', job_id=job_id)}), 202
+
+
+@api_bp.route('/api/jobs/<int:job_id>', methods=['GET'])
+def job_status(job_id):
+    """A background job: status (queued, running, done, failed), progress, result and error."""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
 
 
 # --- Internal helpers ---
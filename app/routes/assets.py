@@ -0,0 +1,59 @@
+import mimetypes
+import os
+
+from flask import Blueprint, abort, current_app, redirect, request, send_file, send_from_directory
+from werkzeug.security import safe_join
+
+from app.assets import DIST_DIR
+from app.db import get_db
+from app.thumbnails import THUMBNAIL_WIDTHS, get_store, source_digest, thumbnail_url
+
+assets_bp = Blueprint('assets', __name__)
+
+_PRECOMPRESSED = {'br': '.br', 'gzip': '.gz'}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+@assets_bp.route(f'/static/{DIST_DIR}/<path:filename>')
+def dist_file(filename):
+    """Serve a built asset: fingerprinted, so cacheable forever; precompressed when the client allows."""
+    directory = os.path.join(current_app.static_folder, DIST_DIR)
+    encoding = request.accept_encodings.best_match(list(_PRECOMPRESSED))
+    compressed = safe_join(directory, filename + _PRECOMPRESSED[encoding]) if encoding else None
+
+    if compressed and os.path.isfile(compressed):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(directory, filename + _PRECOMPRESSED[encoding],
+                                       mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+        response.content_encoding = encoding
+    else:
+        response = send_from_directory(directory, filename, max_age=IMMUTABLE_MAX_AGE)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.immutable = True
+    return response
+
+
+@assets_bp.route('/thumbnails/<int:video_id>/<digest>/<int:width>.webp')
+def thumbnail(video_id, digest, width):
+    """A video thumbnail resized to `width`, from the local cache; the original until it is built.
+
+    Only reads: the builds are queued when thumbnail_url is written, and
+    `flask fetch-thumbnails` fills in the rest.
+    """
+    if width not in THUMBNAIL_WIDTHS:
+        abort(404)
+    row = get_db().execute('SELECT thumbnail_url FROM videos WHERE id = ?', (video_id,)).fetchone()
+    if row is None or not row['thumbnail_url']:
+        abort(404)
+    source_url = row['thumbnail_url']
+    if digest != source_digest(source_url):
+        # The video got a new thumbnail since the page was rendered
+        return redirect(thumbnail_url(video_id, source_url, width))
+
+    path = get_store().cached(video_id, source_url, width)
+    if path is None:
+        return redirect(source_url)
+
+    response = send_file(path, mimetype='image/webp', max_age=IMMUTABLE_MAX_AGE)
+    response.cache_control.immutable = True
+    return response
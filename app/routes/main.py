@@ -1,8 +1,9 @@
-import json
-import sqlite3
-from flask import Blueprint, render_template, request, session, current_app
+from flask import (Blueprint, render_template, stream_template, request, session, current_app,
+                   abort, make_response, url_for)
 
-from app.db import get_db, get_songs
+from app.db import (get_facets, get_videos_with_songs, iter_songs, count_songs,
+                    song_filters, SONG_COLUMNS)
+from app.catalog import get_catalog, data_version, data_changed_at, song_record
 from app.categories import categorize_video
 
 main_bp = Blueprint('main', __name__)
@@ -14,73 +15,100 @@ def index():
     if current_app.config['AUTO_LOGIN'] and 'admin' not in session and 'logged_out' not in session:
         session['admin'] = True
 
-    category = request.args.get('category', 'all')
-    search = request.args.get('search', '').strip()
-    composer_filter = request.args.get('composer', 'all')
-    performer_filter = request.args.get('performer', 'all')
-    style_filter = request.args.get('style', 'all')
-    era_filter = request.args.get('era', 'all')
-    depth_filter = request.args.get('depth', 'all')
+    # Normalised like the listing filters: 'all', empty, padded and missing values are the same page
+    filters = song_filters(request.args)
+    category = filters.get('category', 'all')
+    search = filters.get('search', '')
+    composer_filter = filters.get('composer', 'all')
+    performer_filter = filters.get('performer', 'all')
+    style_filter = filters.get('style', 'all')
+    era_filter = filters.get('era', 'all')
+    depth_filter = filters.get('depth', 'all')
     view = request.args.get('view', 'songs')
     sort = request.args.get('sort', 'date')
-
-    songs = get_songs()
-
-    # Index view - Real Book style alphabetical list
+    is_admin = session.get('admin', False)
+
+    if current_app.config['STREAM_LISTINGS'] and view == 'songs':
+        return _stream_songs(sort, is_admin, category, search, composer_filter,
+                             performer_filter, style_filter, era_filter, depth_filter)
+
+    # The page is a function of these values and the catalog data version only
+    key = (view, sort, is_admin, tuple(sorted(filters.items())))
+    page_cache = current_app.extensions['page_cache']
+    version = data_version()
+    page = page_cache.get(key, version)
+    if page is None:
+        html = _render_index(view, sort, is_admin, category, search, composer_filter,
+                             performer_filter, style_filter, era_filter, depth_filter)
+        page = page_cache.put(key, version, html.encode(), data_changed_at())
+    return page.response()
+
+
+def _stream_songs(sort, is_admin, category, search, composer_filter,
+                  performer_filter, style_filter, era_filter, depth_filter):
+    """Stream the songs view straight off the database cursor.
+
+    The header is sent as soon as it renders and each row is built as it is
+    fetched, so neither time-to-first-byte nor memory grows with the catalog.
+    Streamed pages bypass the page cache.
+    """
+    filters = song_filters(request.args)
+
+    total = count_songs(filters)
+    rows = iter_songs(filters, sort, SONG_COLUMNS)
+    facets = {facet: [value for value, count in values] for facet, values in get_facets().items()}
+    return stream_template('index.html',
+                           videos=(song_record(row) for row in rows),
+                           total=total,
+                           category=category,
+                           categories=facets['category'],
+                           search=search,
+                           composer_filter=composer_filter,
+                           performer_filter=performer_filter,
+                           style_filter=style_filter,
+                           era_filter=era_filter,
+                           depth_filter=depth_filter,
+                           composers=facets['composer'],
+                           performers=facets['performer'],
+                           styles=facets['style'],
+                           eras=facets['era'],
+                           depths=facets['depth'],
+                           is_admin=is_admin,
+                           view='songs', sort=sort)
+
+
+def _render_index(view, sort, is_admin, category, search, composer_filter,
+                  performer_filter, style_filter, era_filter, depth_filter):
+    catalog = get_catalog()
+
+    # Index view - Real Book style alphabetical list: the first letters are
+    # rendered, the others are fetched from /api/index/<letter> as they scroll in
     if view == 'index':
-        processed = []
-        for s in songs:
-            url = s['url'] or ''
-            if url and s['timestamp']:
-                timestamp = s['timestamp']
-                if timestamp and ':' in timestamp:
-                    parts = timestamp.split(':')
-                    if len(parts) == 2:
-                        try:
-                            minutes = int(parts[0])
-                            seconds = int(parts[1])
-                            total_seconds = minutes * 60 + seconds
-                            url = f"{url}&t={total_seconds}s"
-                        except ValueError:
-                            pass
-
-            processed.append({
-                'id': s['id'],
-                'song_title': s['song_title'] or 'Sans titre',
-                'composer': s['composer'] or '',
-                'performer': s['performer'] or '',
-                'album': s['album'] or '',
-                'style': s['style'] or '',
-                'url': url,
-                'analysis_depth': s['analysis_depth'] or ''
-            })
-
-        if depth_filter != 'all':
-            processed = [s for s in processed if s['analysis_depth'] == depth_filter]
-
-        processed.sort(key=lambda x: x['song_title'].lower())
+        letters = []
+        rendered = 0
+        for letter, entries in catalog.index_buckets.items():
+            if depth_filter != 'all':
+                entries = [s for s in entries if s['analysis_depth'] == depth_filter]
+            if not entries:
+                continue
+            loaded = rendered < current_app.config['INDEX_INITIAL_SONGS']
+            if loaded:
+                rendered += len(entries)
+            letters.append({'letter': letter, 'count': len(entries), 'songs': entries if loaded else None})
 
         return render_template('index_view.html',
-                             songs=processed,
+                             letters=letters,
+                             total=sum(bucket['count'] for bucket in letters),
                              depth_filter=depth_filter,
-                             is_admin=session.get('admin', False))
+                             is_admin=is_admin)
 
     # Videos view
-    if view == 'videos' or (not songs and session.get('admin')):
-        db = get_db()
-        cursor = db.cursor()
-        video_order = 'published_at DESC' if sort == 'date' else 'title ASC'
-        cursor.execute(f'SELECT id, title, description, url, published_at, thumbnail_url, video_type, category FROM videos ORDER BY {video_order}')
-        videos = cursor.fetchall()
+    if view == 'videos' or (not catalog.songs and is_admin):
+        videos, songs_by_video = get_videos_with_songs(sort)
 
         video_list = []
         for v in videos:
-            cursor.execute('''SELECT id, song_title, composer, performer, original_artist,
-                            composition_year, style, era, album, record_label,
-                            recording_year, featured_artists, context_notes,
-                            part_number, total_parts
-                            FROM songs WHERE video_id = ? AND (deleted IS NULL OR deleted = 0) ORDER BY part_number''', (v['id'],))
-            all_songs = cursor.fetchall()
+            all_songs = songs_by_video.get(v['id'])
 
             if all_songs:
                 song_data = all_songs[0]
@@ -133,115 +161,63 @@ def index():
 
         return render_template('index.html',
                              videos=video_list,
+                             total=len(video_list),
                              category='all', categories=[],
                              search=search,
                              composer_filter='all', performer_filter='all',
                              style_filter='all', era_filter='all',
                              composers=[], performers=[], styles=[], eras=[],
-                             is_admin=session.get('admin', False),
+                             is_admin=is_admin,
                              view=view, sort=sort)
 
-    # Songs view (default)
-    processed = []
-    for s in songs:
-        cat = s['category'] or categorize_video(s['video_title'], s['description'])
-
-        url = s['url']
-        if s['timestamp']:
-            parts = s['timestamp'].split(':')
-            if len(parts) == 2:
-                seconds = int(parts[0]) * 60 + int(parts[1])
-                url = f"{s['url']}&t={seconds}s"
-
-        songwriters = None
-        other_musicians = None
-        featured_artists = None
-        try:
-            if s['songwriters']:
-                songwriters = json.loads(s['songwriters'])
-            if s['other_musicians']:
-                other_musicians = json.loads(s['other_musicians'])
-            if s['featured_artists']:
-                featured_artists = json.loads(s['featured_artists'])
-        except:
-            pass
-
-        processed.append({
-            'id': s['id'], 'video_id': s['video_id'],
-            'title': s['song_title'], 'composer': s['composer'] or '',
-            'performer': s['performer'] or '', 'original_artist': s['original_artist'] or '',
-            'songwriters': songwriters, 'composition_year': s['composition_year'],
-            'style': s['style'] or '', 'era': s['era'] or '',
-            'other_musicians': other_musicians, 'additional_info': s['additional_info'] or '',
-            'url': url, 'video_title': s['video_title'],
-            'description': s['description'], 'category': cat,
-            'published_at': s['published_at'],
-            'part_number': s['part_number'], 'total_parts': s['total_parts'],
-            'album': s['album'] or '', 'record_label': s['record_label'] or '',
-            'recording_year': s['recording_year'], 'featured_artists': featured_artists,
-            'context_notes': s['context_notes'] or '',
-            'analysis_depth': s['analysis_depth'] or '',
-            'thumbnail_url': s['thumbnail_url'],
-            'video_type': s['video_type'] or 'uncategorized'
-        })
-
-    # Search filter
-    if search:
-        search_lower = search.lower()
-        processed = [s for s in processed if
-                    search_lower in s['title'].lower() or
-                    search_lower in (s['composer'] or '').lower() or
-                    search_lower in (s['performer'] or '').lower() or
-                    search_lower in (s['original_artist'] or '').lower() or
-                    search_lower in (s['style'] or '').lower() or
-                    search_lower in (s['era'] or '').lower() or
-                    search_lower in (s['album'] or '').lower() or
-                    search_lower in (s['record_label'] or '').lower() or
-                    search_lower in s['video_title'].lower()]
-
-    if category != 'all':
-        processed = [s for s in processed if s['category'] == category]
-    if composer_filter != 'all':
-        processed = [s for s in processed if s['composer'] and composer_filter.lower() in s['composer'].lower()]
-    if performer_filter != 'all':
-        processed = [s for s in processed if s['performer'] and performer_filter.lower() in s['performer'].lower()]
-    if style_filter != 'all':
-        processed = [s for s in processed if s['style'] and style_filter.lower() in s['style'].lower()]
-    if era_filter != 'all':
-        processed = [s for s in processed if s['era'] and era_filter.lower() in s['era'].lower()]
-    if depth_filter != 'all':
-        processed = [s for s in processed if s['analysis_depth'] and depth_filter == s['analysis_depth']]
-
-    if sort == 'alpha':
-        processed.sort(key=lambda x: x['title'].lower())
-    else:
-        processed.sort(key=lambda x: x.get('published_at') or '', reverse=True)
-
-    # Get all unique values for filter dropdowns (from ALL songs, not just filtered)
-    all_songs = get_songs()
-    all_processed = []
-    for s in all_songs:
-        cat = categorize_video(s['video_title'], s['description'])
-        all_processed.append({
-            'composer': s['composer'] or '', 'performer': s['performer'] or '',
-            'style': s['style'] or '', 'era': s['era'] or '',
-            'category': cat, 'analysis_depth': s['analysis_depth'] or ''
-        })
+    # Songs view (default): the snapshot's facet index picks and orders the records
+    filters = song_filters(request.args)
+    processed = catalog.select(filters, sort)
+
+    # Unfiltered pages hold every card, so main.js can filter them locally from the blob
+    catalog_url = None
+    if current_app.config['CLIENT_FILTERING'] and not filters and sort in ('date', 'alpha'):
+        catalog_url = url_for('main.catalog_blob', version=catalog.blob.version)
 
+    # Dropdown values come from the trigger-maintained facet table (ALL songs, not just filtered)
+    facets = {facet: [value for value, count in values] for facet, values in get_facets().items()}
     return render_template('index.html',
                          videos=processed,
+                         total=len(processed),
                          category=category,
-                         categories=sorted(set(s['category'] for s in all_processed)),
+                         categories=facets['category'],
                          search=search,
                          composer_filter=composer_filter,
                          performer_filter=performer_filter,
                          style_filter=style_filter,
                          era_filter=era_filter,
                          depth_filter=depth_filter,
-                         composers=sorted(set(s['composer'] for s in all_processed if s['composer'])),
-                         performers=sorted(set(s['performer'] for s in all_processed if s['performer'])),
-                         styles=sorted(set(s['style'] for s in all_processed if s['style'])),
-                         eras=sorted(set(s['era'] for s in all_processed if s['era'])),
-                         depths=sorted(set(s['analysis_depth'] for s in all_processed if s['analysis_depth'])),
-                         is_admin=session.get('admin', False),
+                         composers=facets['composer'],
+                         performers=facets['performer'],
+                         styles=facets['style'],
+                         eras=facets['era'],
+                         depths=facets['depth'],
+                         catalog_url=catalog_url,
+                         is_admin=is_admin,
                          view=view, sort=sort)
+
+
+@main_bp.route('/catalog/<version>.json')
+def catalog_blob(version):
+    """The columnar catalog, immutable under its version hash."""
+    blob = get_catalog().blob
+    if version != blob.version:
+        abort(404)
+
+    encoding = request.accept_encodings.best_match(['br', 'gzip'])
+    if encoding in blob.encodings:
+        response = make_response(blob.encodings[encoding])
+        response.content_encoding = encoding
+    else:
+        response = make_response(blob.body)
+    response.mimetype = 'application/json'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
@@ -0,0 +1,144 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from urllib.parse import urlencode
+
+from app.catalog import get_catalog
+from app.db import get_db, get_facets, latest_change
+from app.thumbnails import THUMBNAIL_WIDTHS, thumbnail_url
+from app.trigrams import fold
+
+
+def _slug(value):
+    return re.sub(r'[^a-z0-9]+', '-', fold(value)).strip('-') or '_'
+
+
+def _public_urls():
+    """(url, file) for every public page and JSON document of the catalog.
+
+    Only the pages a visitor reaches without filtering are exported: the
+    songs and videos views in both sorts and the Real Book by depth. Their
+    query strings are fixed, and manifest.json lets the web tier map them
+    to files. Search and filter results (category, composer, style, ...)
+    stay dynamic, so the static host must send those to the app.
+    """
+    catalog = get_catalog()
+    depths = [value for value, count in get_facets()['depth']]
+
+    urls = [
+        ('/', 'index.html'),
+        ('/?sort=alpha', 'songs/alpha.html'),
+        ('/?view=videos', 'videos/index.html'),
+        ('/?view=videos&sort=alpha', 'videos/alpha.html'),
+        ('/?view=index', 'realbook/index.html'),
+        ('/api/facets', 'api/facets.json'),
+    ]
+    for depth in depths:
+        urls.append((f"/?{urlencode({'view': 'index', 'depth': depth})}", f'realbook/{_slug(depth)}.html'))
+    # The Real Book loads its letters from here, depth included
+    for letter in catalog.index_buckets:
+        path = f'/api/index/{"%23" if letter == "#" else letter}'
+        urls.append((path, f'api/index/{_slug(letter)}.json'))
+        for depth in depths:
+            urls.append((f"{path}?{urlencode({'depth': depth})}", f'api/index/{_slug(letter)}-{_slug(depth)}.json'))
+    return urls
+
+
+def _thumbnail_urls():
+    """URLs of the cached thumbnails the exported pages point at."""
+    rows = get_db().execute('SELECT id, thumbnail_url FROM videos WHERE thumbnail_url IS NOT NULL').fetchall()
+    return [thumbnail_url(video_id, source_url, width)
+            for video_id, source_url in rows for width in THUMBNAIL_WIDTHS]
+
+
+def export_static(app, root):
+    """Render every public page into a new snapshot under `root` and make it current.
+
+    The export is written to a fresh `snapshot-*` directory, then the
+    `current` symlink is switched to it in one rename, so a static file
+    server pointed at `<root>/current` only ever sees complete snapshots.
+    `manifest.json` maps every exported URL (path + query string) to its
+    file, for the web tier's rewrite rules. Returns the new directory.
+    """
+    os.makedirs(root, exist_ok=True)
+    target = tempfile.mkdtemp(prefix='snapshot-', dir=root)
+    os.chmod(target, 0o755)
+    try:
+        client = app.test_client()
+        # An anonymous visitor: never auto-logged-in as admin
+        with client.session_transaction() as session:
+            session['logged_out'] = True
+
+        # A request context, for url_for()
+        with app.test_request_context():
+            urls = _public_urls()
+            thumbnails = _thumbnail_urls()
+            catalog = get_catalog()
+            songs = [dict(song) for song in catalog.songs]
+
+        manifest = {}
+        for url, name in urls:
+            response = client.get(url)
+            if response.status_code != 200:
+                raise RuntimeError(f'{url} returned {response.status_code}')
+            path = os.path.join(target, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(response.get_data())
+            manifest[url] = name
+
+        # A thumbnail that can't be fetched redirects to YouTube; the web tier can do the same
+        for url in thumbnails:
+            response = client.get(url)
+            if response.status_code == 200:
+                path = os.path.join(target, url.lstrip('/'))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, 'wb') as f:
+                    f.write(response.get_data())
+
+        with open(os.path.join(target, 'api', 'catalog.json'), 'w', encoding='utf-8') as f:
+            json.dump({'version': catalog.version, 'songs': songs}, f, ensure_ascii=False)
+        manifest['/api/catalog.json'] = 'api/catalog.json'
+        with open(os.path.join(target, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        shutil.copytree(app.static_folder, os.path.join(target, 'static'))
+    except Exception:
+        shutil.rmtree(target, ignore_errors=True)
+        raise
+
+    # Atomically repoint `current`, then drop the snapshot it used to point to
+    link = os.path.join(root, 'current')
+    previous = os.path.realpath(link) if os.path.islink(link) else None
+    staging = link + '.new'
+    if os.path.lexists(staging):
+        os.remove(staging)
+    os.symlink(os.path.basename(target), staging)
+    os.replace(staging, link)
+    if previous and previous != os.path.realpath(target):
+        shutil.rmtree(previous, ignore_errors=True)
+    return target
+
+
+def watch_export(app, root, interval, log=print):
+    """Re-export the snapshot whenever the change feed has moved, at most once every `interval` seconds.
+
+    Runs until interrupted, outside the web processes (`flask export-static
+    --watch`), so a burst of admin edits costs one export, not one per write.
+    """
+    exported = None
+    while True:
+        started = time.monotonic()
+        with app.app_context():
+            # Read before exporting: a write made during the export triggers the next one
+            seq = latest_change()
+        if seq != exported:
+            try:
+                export_static(app, root)
+                exported = seq
+                log(f"[SNAPSHOT] Exported changes up to {seq} to {root}")
+            except Exception as e:
+                log(f"[SNAPSHOT] Export failed: {e}")
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
@@ -0,0 +1,97 @@
+import heapq
+import re
+from bisect import bisect_left
+
+from app.db import split_people
+from app.trigrams import fold
+
+# /api/suggest field -> (songs column, whether the column holds a list of people)
+SUGGEST_FIELDS = {
+    'title': ('song_title', False),
+    'composer': ('composer', True),
+    'performer': ('performer', True),
+    'album': ('album', False),
+}
+
+MAX_SUGGESTIONS = 50
+
+# Prefixes matching more keys than this get their answer precomputed
+_SCAN_LIMIT = 256
+
+
+def _ranked(candidates, limit):
+    """The `limit` most frequent (value, count) pairs, ties alphabetical."""
+    return heapq.nsmallest(limit, candidates, key=lambda item: (-item[1], item[0]))
+
+
+class SuggestIndex:
+    """Sorted arrays of folded keys for prefix lookups with bisect.
+
+    Every word start of a value is a key ('bill evans' and 'evans' both lead
+    to "Bill Evans"), and matches are ranked by how many songs carry the
+    value. Short, common prefixes would cover most of the array, so their
+    best matches are computed when the index is built; any other prefix
+    scans at most _SCAN_LIMIT keys.
+    """
+
+    def __init__(self, rows):
+        self.fields = {}
+        for field, (column, people) in SUGGEST_FIELDS.items():
+            counts = {}
+            for row in rows:
+                for value in (split_people(row[column]) if people else [row[column]]):
+                    value = ' '.join((value or '').split())
+                    if value:
+                        counts[value] = counts.get(value, 0) + 1
+            entries = sorted(counts.items())
+            keyed = sorted((key, i) for i, (value, count) in enumerate(entries)
+                           for key in self._keys(value))
+            keys = [key for key, i in keyed]
+            positions = [i for key, i in keyed]
+            self.fields[field] = (keys, positions, entries, self._precompute(keys, positions, entries))
+
+    @staticmethod
+    def _keys(value):
+        folded = fold(value)
+        return {folded[m.start():] for m in re.finditer(r'\w+', folded)}
+
+    @staticmethod
+    def _matches(positions, entries, start, end):
+        return [entries[i] for i in set(positions[start:end])]
+
+    def _precompute(self, keys, positions, entries):
+        """{prefix: best matches} for every prefix matching more than _SCAN_LIMIT keys."""
+        top = {}
+        ranges = [('', 0, len(keys))]
+        while ranges:
+            prefix, start, end = ranges.pop()
+            depth = len(prefix) + 1
+            i = start
+            while i < end:
+                if len(keys[i]) < depth:
+                    i += 1
+                    continue
+                child = keys[i][:depth]
+                j = bisect_left(keys, child + '\uffff', i, end)
+                if j - i > _SCAN_LIMIT:
+                    top[child] = _ranked(self._matches(positions, entries, i, j), MAX_SUGGESTIONS)
+                    ranges.append((child, i, j))
+                i = j
+        return top
+
+    def suggest(self, field, prefix, limit=10):
+        """[(value, count)] of `field` (or 'all') with a word starting with `prefix`, most frequent first."""
+        prefix = ' '.join(fold(prefix).split())
+        if not prefix:
+            return []
+        candidates = {}
+        for name in (SUGGEST_FIELDS if field == 'all' else (field,)):
+            keys, positions, entries, top = self.fields[name]
+            if prefix in top:
+                matches = top[prefix]
+            else:
+                start = bisect_left(keys, prefix)
+                matches = self._matches(positions, entries, start, bisect_left(keys, prefix + '\uffff', start))
+            for value, count in matches:
+                candidates[value] = max(count, candidates.get(value, 0))
+        return _ranked(candidates.items(), min(limit, MAX_SUGGESTIONS))
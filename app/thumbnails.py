@@ -0,0 +1,173 @@
+import hashlib
+import io
+import os
+import time
+import urllib.request
+from urllib.parse import urlparse
+
+from flask import current_app, url_for
+
+from app.db import get_db
+from app.jobs import enqueue, job
+
+# Widths stored for every thumbnail; cards are ~400px wide, the larger one is for 2x screens
+THUMBNAIL_WIDTHS = (400, 800)
+WEBP_QUALITY = 80
+# A build lock older than this was left by a crashed builder
+LOCK_EXPIRY = 600
+
+
+def http_fetcher(url, timeout=10):
+    """Download a thumbnail over HTTP."""
+    request = urllib.request.Request(url, headers={'User-Agent': 'piano-jazz-concept'})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return response.read()
+
+
+def directory_fetcher(root):
+    """A fetcher reading https://host/<path> from <root>/<path>, for working offline against fixtures."""
+    def fetch(url):
+        with open(os.path.join(root, urlparse(url).path.lstrip('/')), 'rb') as f:
+            return f.read()
+    return fetch
+
+
+def source_digest(source_url):
+    """Short hash of the source URL: a new YouTube thumbnail gets new cached files and URLs."""
+    return hashlib.sha1(source_url.encode()).hexdigest()[:10]
+
+
+class ThumbnailStore:
+    """Resized WebP copies of the video thumbnails, fetched once and kept on disk.
+
+    Files live at <directory>/<video id>/<source digest>.w<width>.webp.
+    Requests only look them up: build() writes every width at once and
+    runs in the job queued when a video's thumbnail_url is written, or from
+    `flask fetch-thumbnails`. `fetcher` is
+    any callable url -> bytes. A source that can't be fetched or decoded is
+    not tried again for `retry_after` seconds.
+    """
+
+    def __init__(self, directory, fetcher=http_fetcher, retry_after=3600):
+        self.directory = directory
+        self.fetcher = fetcher
+        self.retry_after = retry_after
+
+    def path(self, video_id, digest, width):
+        return os.path.join(self.directory, str(video_id), f'{digest}.w{width}.webp')
+
+    def _marker(self, video_id, digest, suffix):
+        return os.path.join(self.directory, str(video_id), f'{digest}.{suffix}')
+
+    def cached(self, video_id, source_url, width):
+        """Path of the `width` variant of a video's thumbnail, or None if it isn't built yet."""
+        path = self.path(video_id, source_digest(source_url), width)
+        return path if os.path.exists(path) else None
+
+    def failed_recently(self, video_id, source_url):
+        try:
+            failed_at = os.path.getmtime(self._marker(video_id, source_digest(source_url), 'failed'))
+        except OSError:
+            return False
+        return time.time() - failed_at < self.retry_after
+
+    def build(self, video_id, source_url, retry_failed=False):
+        """Fetch the source and write every width; False if it failed recently or another build is running.
+
+        Raises whatever the fetch or the decoding raised, after recording the
+        failure.
+        """
+        digest = source_digest(source_url)
+        if all(os.path.exists(self.path(video_id, digest, width)) for width in THUMBNAIL_WIDTHS):
+            return True
+        if not retry_failed and self.failed_recently(video_id, source_url):
+            return False
+
+        os.makedirs(os.path.join(self.directory, str(video_id)), exist_ok=True)
+        # One builder per thumbnail across threads and processes; a lock left by a crash expires
+        lock = self._marker(video_id, digest, 'lock')
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock) < LOCK_EXPIRY:
+                    return False
+                os.remove(lock)
+            except OSError:
+                return False  # the other builder just finished
+            return self.build(video_id, source_url, retry_failed)
+        os.close(fd)
+        failed = self._marker(video_id, digest, 'failed')
+        try:
+            self._build(video_id, digest, self.fetcher(source_url))
+        except Exception as e:
+            with open(failed, 'w') as f:
+                f.write(f'{source_url}: {e}\n')
+            raise
+        finally:
+            os.remove(lock)
+        if os.path.exists(failed):
+            os.remove(failed)
+        return True
+
+    def _build(self, video_id, digest, data):
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as image:
+            image = image.convert('RGB')
+            for width in THUMBNAIL_WIDTHS:
+                resized = image
+                if image.width > width:
+                    resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                path = self.path(video_id, digest, width)
+                # Write then rename, so a concurrent reader never sees half a file
+                resized.save(path + '.tmp', 'WEBP', quality=WEBP_QUALITY, method=6)
+                os.replace(path + '.tmp', path)
+
+
+@job('thumbnails')
+def _thumbnails_job(job):
+    """Build the thumbnails of job.params['video_ids']; a source that fails only skips its video."""
+    store = get_store()
+    built = failed = 0
+    for video_id in job.params['video_ids']:
+        row = get_db().execute('SELECT thumbnail_url FROM videos WHERE id = ?', (video_id,)).fetchone()
+        if row is None or not row['thumbnail_url']:
+            continue
+        try:
+            built += store.build(video_id, row['thumbnail_url'])
+        except Exception as e:
+            failed += 1
+            print(f"[THUMBNAILS] {row['thumbnail_url']}: {e}")
+    return {'built': built, 'failed': failed}
+
+
+def schedule_thumbnails(video_ids):
+    """Queue one job building the thumbnails of these videos, whose thumbnail_url was just written."""
+    if video_ids:
+        return enqueue('thumbnails', video_ids=sorted(video_ids))
+
+
+def thumbnail_url(video_id, source_url, width=THUMBNAIL_WIDTHS[0]):
+    """URL of the cached `width` WebP of a video's thumbnail (the source URL itself if unknown)."""
+    if not video_id or not source_url:
+        return source_url
+    return url_for('assets.thumbnail', video_id=video_id, digest=source_digest(source_url), width=width)
+
+
+def thumbnail_srcset(video_id, source_url):
+    """srcset listing every cached width of a video's thumbnail."""
+    if not video_id or not source_url:
+        return ''
+    return ', '.join(f'{thumbnail_url(video_id, source_url, width)} {width}w' for width in THUMBNAIL_WIDTHS)
+
+
+def create_store(app):
+    """The app's ThumbnailStore: local fixtures when THUMBNAIL_FIXTURES is set, else HTTP."""
+    fixtures = app.config.get('THUMBNAIL_FIXTURES')
+    fetcher = directory_fetcher(fixtures) if fixtures else http_fetcher
+    return ThumbnailStore(app.config['THUMBNAIL_DIR'], fetcher, app.config['THUMBNAIL_RETRY_AFTER'])
+
+
+def get_store():
+    return current_app.extensions['thumbnails']
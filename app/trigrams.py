@@ -0,0 +1,71 @@
+import re
+import unicodedata
+
+import numpy as np
+
+# Song fields the fuzzy search looks at
+TRIGRAM_FIELDS = ('song_title', 'composer', 'performer', 'original_artist', 'video_title')
+
+# Share of the query's trigrams a song must contain to match
+MIN_SIMILARITY = 0.6
+
+# Queries with fewer letters/digits than this are matched as substrings: too short for trigrams or prefixes
+MIN_QUERY_CHARS = 3
+
+# Fuzzy matches are only added when full-text search finds fewer songs than this
+FUZZY_BELOW_HITS = 5
+
+
+def fold(text):
+    """Lowercase `text` and strip accents: 'Amicalement Vôtre' -> 'amicalement votre'."""
+    decomposed = unicodedata.normalize('NFKD', text or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def is_short_query(text):
+    """Whether `text` has fewer than MIN_QUERY_CHARS word characters once folded ('a', 'c++')."""
+    return sum(len(word) for word in re.findall(r'\w+', fold(text))) < MIN_QUERY_CHARS
+
+
+def trigrams(text):
+    """Trigrams of each word of the folded text, padded like pg_trgm ('  v', ' vo', ..., 're ')."""
+    grams = set()
+    for word in re.findall(r'\w+', fold(text)):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class TrigramIndex:
+    """Trigram -> row positions postings over the folded song/artist/video-title text.
+
+    A query is scored against every song sharing at least one of its
+    trigrams by counting hits over the postings, so the cost follows the
+    postings touched rather than the catalog size.
+    """
+
+    def __init__(self, rows):
+        self.ids = np.fromiter((row['id'] for row in rows), dtype=np.int64, count=len(rows))
+        postings = {}
+        for pos, row in enumerate(rows):
+            text = ' '.join(row[field] or '' for field in TRIGRAM_FIELDS)
+            for gram in trigrams(text):
+                postings.setdefault(gram, []).append(pos)
+        self.postings = {gram: np.array(positions, dtype=np.int32) for gram, positions in postings.items()}
+
+    def search(self, text, min_similarity=MIN_SIMILARITY):
+        """[(song id, similarity)] for the songs matching `text`, most similar first.
+
+        Similarity is the share of the query's trigrams found in the song, so
+        a typo or a missing accent only costs the few trigrams it touches.
+        """
+        grams = trigrams(text)
+        hits = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not hits:
+            return []
+        counts = np.bincount(np.concatenate(hits), minlength=len(self.ids))
+        scores = counts / len(grams)
+        matched = np.flatnonzero(scores >= min_similarity)
+        # Best score first, catalog order among ties
+        matched = matched[np.argsort(-scores[matched], kind='stable')]
+        return [(int(self.ids[pos]), float(scores[pos])) for pos in matched]
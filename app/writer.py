@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+from concurrent.futures import Future
+
+from flask import current_app, g
+
+from app.catalog import invalidate_catalog
+from app.db import get_db
+
+
+class WriteQueueFull(Exception):
+    """More writes are waiting than WRITE_QUEUE_SIZE allows."""
+
+
+class _Write:
+    def __init__(self, func):
+        self.func = func
+        self.future = Future()
+
+
+class DatabaseWriter:
+    """The one thread that writes to the database.
+
+    Routes hand it a function of the connection with write(); the thread
+    runs whatever has queued up meanwhile (up to WRITE_BATCH_SIZE writes) in
+    one transaction, each write in its own savepoint so a failing one doesn't
+    take the others down, and commits once. Callers never hold a transaction
+    open themselves, so slow work (LLM calls, HTTP) can't block anyone else's
+    writes: it happens before write() is called.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.queue = queue.Queue(maxsize=app.config['WRITE_QUEUE_SIZE'])
+        self.batch_size = app.config['WRITE_BATCH_SIZE']
+        self.queue_timeout = app.config['WRITE_QUEUE_TIMEOUT']
+        self.commits = 0
+        self.writes = 0
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, func):
+        """Run func(db) in the writer's next transaction; return its result once committed."""
+        if threading.current_thread() is self._thread:
+            return func(get_db())
+        self._ensure_started()
+        write = _Write(func)
+        try:
+            self.queue.put(write, timeout=self.queue_timeout)
+        except queue.Full:
+            raise WriteQueueFull('Too many pending writes, try again shortly')
+        return write.future.result()
+
+    def _ensure_started(self):
+        # Started on first use, and again in a forked worker (threads don't survive fork)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='db-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with self.app.app_context():
+                    self._commit(batch)
+            except Exception as e:
+                print(f"[WRITER] Batch failed: {e}")
+                for write in batch:
+                    if not write.future.done():
+                        write.future.set_exception(e)
+
+    def _commit(self, batch):
+        db = get_db()
+        g.before_commit = []
+        done = []
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            for write in batch:
+                hooks = len(g.before_commit)
+                db.execute('SAVEPOINT write')
+                try:
+                    result = write.func(db)
+                except Exception as e:
+                    db.execute('ROLLBACK TO write')
+                    db.execute('RELEASE write')
+                    # Its hooks go with it
+                    del g.before_commit[hooks:]
+                    write.future.set_exception(e)
+                else:
+                    db.execute('RELEASE write')
+                    done.append((write, result))
+            if done:
+                for func in g.before_commit:
+                    func()
+            db.commit()
+        except Exception as e:
+            if db.in_transaction:
+                db.rollback()
+            for write, result in done:
+                write.future.set_exception(e)
+            return
+
+        self.commits += 1
+        self.writes += len(done)
+        for write, result in done:
+            write.future.set_result(result)
+
+
+def write(func, catalog=True):
+    """Run func(db) on the writer thread and return its result once committed.
+
+    The catalog follows the change feed, whichever process wrote; catalog=False
+    marks writes that leave it alone (job bookkeeping), so the caller's request
+    doesn't read the data version again.
+    """
+    result = current_app.extensions['writer'].submit(func)
+    if catalog:
+        invalidate_catalog()
+    return result
+
+
+def before_commit(func):
+    """From inside a write: run func() once before the batch commits (e.g. a recount several writes need)."""
+    if func not in g.before_commit:
+        g.before_commit.append(func)
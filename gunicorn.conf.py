@@ -1,4 +1,4 @@
 # Gunicorn configuration file
-timeout = 120  # 2 minutes for LLM API calls
+timeout = 120  # 2 minutes for the YouTube description tools (LLM calls run as background jobs)
 workers = 1
 bind = "0.0.0.0:10000"
@@ -34,6 +34,14 @@ function hideUndoNotification() {
 }
 
 async function undoLastChange() {
+    // Edits not sent yet are simply dropped
+    if (pendingEdits.size > 0) {
+        pendingEdits.forEach(edit => edit.revert());
+        pendingEdits.clear();
+        clearTimeout(flushTimer);
+        showUndoDone('\u2713 Modification annul\u00e9e');
+        return;
+    }
     if (undoStack.length === 0) return;
 
     const lastChange = undoStack.pop();
@@ -49,36 +57,21 @@ async function undoLastChange() {
             const result = await response.json();
             if (result.success) {
                 lastChange.cardParent.insertAdjacentHTML('beforeend', lastChange.cardHTML);
-                const notification = document.getElementById('undoNotification');
-                const messageSpan = document.getElementById('undoMessage');
-                messageSpan.textContent = '\u2713 Song restored';
-                notification.classList.add('show');
-                setTimeout(() => { notification.classList.remove('show'); }, 2000);
+                showUndoDone('\u2713 Song restored');
             }
         } else {
-            const response = await fetch('/api/update_song', {
-                method: 'POST',
-                headers: { 'Content-Type': 'application/json' },
-                body: JSON.stringify({
-                    id: lastChange.songId,
-                    field: lastChange.field,
-                    value: lastChange.oldValue
-                })
-            });
-            const result = await response.json();
+            const result = await sendBatch(lastChange.edits.map(edit => ({ ...edit.op, value: edit.oldValue })));
             if (result.success) {
-                const editableField = document.querySelector(
-                    `[data-id="${lastChange.songId}"][data-field="${lastChange.field}"]`
-                );
-                if (editableField) {
-                    const fieldValue = editableField.querySelector('.field-value');
-                    fieldValue.textContent = lastChange.oldValue || 'Non renseign\u00e9';
+                for (const edit of lastChange.edits) {
+                    const editableField = document.querySelector(
+                        `[data-id="${edit.op.song_id}"][data-field="${edit.op.field}"]`
+                    );
+                    if (editableField) {
+                        const fieldValue = editableField.querySelector('.field-value');
+                        fieldValue.textContent = edit.oldValue || 'Non renseign\u00e9';
+                    }
                 }
-                const notification = document.getElementById('undoNotification');
-                const messageSpan = document.getElementById('undoMessage');
-                messageSpan.textContent = '\u2713 Modification annul\u00e9e';
-                notification.classList.add('show');
-                setTimeout(() => { notification.classList.remove('show'); }, 2000);
+                showUndoDone('\u2713 Modification annul\u00e9e');
             }
         }
     } catch (error) {
@@ -86,6 +79,89 @@ async function undoLastChange() {
     }
 }
 
+function showUndoDone(message) {
+    const notification = document.getElementById('undoNotification');
+    const messageSpan = document.getElementById('undoMessage');
+    messageSpan.textContent = message;
+    notification.classList.add('show');
+    setTimeout(() => { notification.classList.remove('show'); }, 2000);
+}
+
+// --- Pending edits ---
+// Saved fields are queued and sent together to /api/batch_update once the
+// admin has stopped editing for FLUSH_DELAY_MS, so cleaning up a whole
+// album is one request and one commit. Later edits of a field replace
+// earlier ones still in the queue.
+
+const FLUSH_DELAY_MS = 1500;
+let pendingEdits = new Map();
+let flushTimer = null;
+
+function queueEdit(op, oldValue, revert) {
+    const key = `${op.song_id != null ? 's' : 'v'}:${op.song_id ?? op.video_id}:${op.field}`;
+    const previous = pendingEdits.get(key);
+    // Undo and failures go back to the value before the first queued edit
+    pendingEdits.set(key, previous ? { ...previous, op } : { op, oldValue, revert });
+    scheduleFlush();
+}
+
+function scheduleFlush() {
+    clearTimeout(flushTimer);
+    flushTimer = setTimeout(() => {
+        // Still typing in a field: wait for it
+        if (document.querySelector('.editable-field input')) {
+            scheduleFlush();
+        } else {
+            flushEdits();
+        }
+    }, FLUSH_DELAY_MS);
+}
+
+async function sendBatch(operations) {
+    const response = await fetch('/api/batch_update', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ operations: operations })
+    });
+    return response.json();
+}
+
+async function flushEdits() {
+    clearTimeout(flushTimer);
+    if (pendingEdits.size === 0) return true;
+
+    const edits = [...pendingEdits.values()];
+    pendingEdits.clear();
+    try {
+        const result = await sendBatch(edits.map(edit => edit.op));
+        if (result.success) {
+            undoStack.push({ type: 'edits', edits: edits });
+            document.querySelectorAll('.field-pending').forEach(el => el.classList.remove('field-pending'));
+            if (edits.length === 1) {
+                const op = edits[0].op;
+                showUndoNotification(`Modifi\u00e9: ${op.field} \u2192 "${op.value || 'vide'}"`);
+            } else {
+                showUndoNotification(`${edits.length} modifications enregistr\u00e9es`);
+            }
+            return true;
+        }
+        alert('Erreur lors de la sauvegarde: ' + (result.error || 'Unknown error'));
+    } catch (error) {
+        alert('Erreur r\u00e9seau: ' + error.message);
+    }
+    edits.forEach(edit => edit.revert());
+    return false;
+}
+
+// Leaving the page (filter link, reload, closing the tab) sends what is still queued
+window.addEventListener('pagehide', () => {
+    if (pendingEdits.size === 0) return;
+    const operations = [...pendingEdits.values()].map(edit => edit.op);
+    navigator.sendBeacon('/api/batch_update',
+        new Blob([JSON.stringify({ operations: operations })], { type: 'application/json' }));
+    pendingEdits.clear();
+});
+
 // --- Inline field editing ---
 
 function editField(editIcon) {
@@ -122,7 +198,7 @@ function editField(editIcon) {
     input.select();
 }
 
-async function saveField(input, fieldValue, linkParent, songId, field) {
+function saveField(input, fieldValue, linkParent, songId, field) {
     const newValue = input.value.trim();
     const originalValue = input.dataset.originalValue;
     const elementToShow = linkParent || fieldValue;
@@ -134,40 +210,16 @@ async function saveField(input, fieldValue, linkParent, songId, field) {
     }
 
     const oldValue = originalValue === 'Non renseign\u00e9' ? null : originalValue;
+    const editableField = fieldValue.closest('.editable-field');
 
-    try {
-        const response = await fetch('/api/update_song', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                id: songId,
-                field: field,
-                value: newValue || null
-            })
-        });
-        const result = await response.json();
-
-        if (result.success) {
-            undoStack.push({
-                songId: songId,
-                field: field,
-                oldValue: oldValue,
-                newValue: newValue || null
-            });
-            fieldValue.textContent = newValue || 'Non renseign\u00e9';
-            elementToShow.style.display = '';
-            input.remove();
-            showUndoNotification(`Modifi\u00e9: ${field} \u2192 "${newValue || 'vide'}"`);
-        } else {
-            alert('Erreur lors de la sauvegarde: ' + (result.error || 'Unknown error'));
-            elementToShow.style.display = '';
-            input.remove();
-        }
-    } catch (error) {
-        alert('Erreur r\u00e9seau: ' + error.message);
-        elementToShow.style.display = '';
-        input.remove();
-    }
+    queueEdit({ song_id: songId, field: field, value: newValue || null }, oldValue, () => {
+        fieldValue.textContent = originalValue;
+        editableField.classList.remove('field-pending');
+    });
+    fieldValue.textContent = newValue || 'Non renseign\u00e9';
+    editableField.classList.add('field-pending');
+    elementToShow.style.display = '';
+    input.remove();
 }
 
 // --- Category editing ---
@@ -185,25 +237,12 @@ function toggleCategoryDropdown(event, itemId, currentCategory) {
 
 async function updateCategory(itemId, newCategory) {
     const view = new URLSearchParams(window.location.search).get('view') || 'songs';
-    try {
-        const response = await fetch('/api/update_category', {
-            method: 'POST',
-            headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({
-                id: itemId,
-                category: newCategory,
-                view: view
-            })
-        });
-        const result = await response.json();
-        if (result.success) {
-            document.getElementById(`category-dropdown-${itemId}`).classList.remove('show');
-            location.reload();
-        } else {
-            alert('\u274c Error: ' + (result.error || 'Unknown error'));
-        }
-    } catch (error) {
-        alert('\u274c Network error: ' + error.message);
+    const op = view === 'videos' ? { video_id: itemId } : { song_id: itemId };
+    // Sent right away, with any field edits still queued, since the page reloads
+    queueEdit({ ...op, field: 'category', value: newCategory }, null, () => {});
+    if (await flushEdits()) {
+        document.getElementById(`category-dropdown-${itemId}`).classList.remove('show');
+        location.reload();
     }
 }
 
@@ -149,6 +149,10 @@ document.addEventListener('DOMContentLoaded', () => {
         alphabetNav.appendChild(btn);
     });
 
+    loadFacetCounts();
+    setupSearchSuggestions();
+    setupClientFiltering();
+
     // Linkify URLs in video descriptions
     document.querySelectorAll('.video-description').forEach(el => {
         el.innerHTML = el.innerHTML.replace(
@@ -158,10 +162,173 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 });
 
+// --- Facet counts in filter dropdowns ---
+
+async function loadFacetCounts() {
+    const selects = document.querySelectorAll('select[data-facet]');
+    if (selects.length === 0) return;
+    // In client filtering mode the counts come from the catalog blob
+    const grid = document.getElementById('cards');
+    if (grid && grid.dataset.catalog) return;
+    try {
+        const response = await fetch('/api/facets' + window.location.search);
+        const data = await response.json();
+        if (!data.success) return;
+        const facets = {};
+        Object.entries(data.facets).forEach(([facet, values]) => {
+            facets[facet] = new Map(values.map(f => [f.value, f.count]));
+        });
+        showFacetCounts(facets);
+    } catch (error) {
+        console.error('Error fetching facet counts:', error);
+    }
+}
+
+function showFacetCounts(facets) {
+    document.querySelectorAll('select[data-facet]').forEach(select => {
+        const counts = facets[select.dataset.facet] || new Map();
+        Array.from(select.options).forEach(option => {
+            if (option.value === 'all') return;
+            option.textContent = `${option.value} (${counts.get(option.value) || 0})`;
+        });
+    });
+}
+
+// --- Client-side filtering (CLIENT_FILTERING) ---
+// The unfiltered songs page holds every card; the catalog blob says which
+// ones each filter keeps, so filter and sort changes never hit the server.
+
+async function setupClientFiltering() {
+    const grid = document.getElementById('cards');
+    if (!grid || !grid.dataset.catalog) return;
+    let catalog;
+    try {
+        const response = await fetch(grid.dataset.catalog);
+        catalog = await response.json();
+    } catch (error) {
+        console.error('Error fetching catalog:', error);
+        return;
+    }
+
+    const cards = new Map(Array.from(grid.querySelectorAll('.video-card'), card => [Number(card.dataset.songId), card]));
+    const params = new URLSearchParams(window.location.search);
+    const state = { sort: params.get('sort') || 'date', filters: {} };
+
+    document.querySelectorAll('select[data-facet]').forEach(select => {
+        state.filters[select.dataset.facet] = select.value;
+        select.removeAttribute('onchange');
+        select.onchange = () => {
+            state.filters[select.dataset.facet] = select.value;
+            applyClientFilters(catalog, cards, grid, state);
+        };
+    });
+    document.querySelectorAll('a.view-tab[data-sort]').forEach(link => {
+        link.addEventListener('click', event => {
+            event.preventDefault();
+            state.sort = link.dataset.sort;
+            document.querySelectorAll('a.view-tab[data-sort]').forEach(l => l.classList.toggle('active', l === link));
+            applyClientFilters(catalog, cards, grid, state);
+        });
+    });
+    applyClientFilters(catalog, cards, grid, state);
+}
+
+function clientMatcher(catalog, filters, skip) {
+    const tests = [];
+    Object.entries(filters).forEach(([facet, value]) => {
+        if (value === 'all' || facet === skip) return;
+        const column = catalog.columns[facet];
+        const dictionary = catalog.dictionaries[facet];
+        if (facet === 'composer' || facet === 'performer') {
+            // Every person named in the selected value must be credited on the song
+            const people = catalog.people[facet];
+            const code = dictionary.indexOf(value);
+            const wanted = code > 0 ? people[code] : [];
+            tests.push(i => wanted.length > 0 && wanted.every(p => people[column[i]].includes(p)));
+        } else if (facet === 'style' || facet === 'era') {
+            const needle = value.toLowerCase();
+            const hits = dictionary.map(v => v !== '' && v.toLowerCase().includes(needle));
+            tests.push(i => hits[column[i]]);
+        } else {
+            const code = dictionary.indexOf(value);
+            tests.push(i => column[i] === code);
+        }
+    });
+    return i => tests.every(test => test(i));
+}
+
+function applyClientFilters(catalog, cards, grid, state) {
+    const matches = clientMatcher(catalog, state.filters);
+    const fragment = document.createDocumentFragment();
+    let shown = 0;
+    catalog.orders[state.sort].forEach(i => {
+        const card = cards.get(catalog.ids[i]);
+        if (!card) return;
+        const visible = matches(i);
+        card.style.display = visible ? '' : 'none';
+        if (visible) shown++;
+        fragment.appendChild(card);
+    });
+    grid.appendChild(fragment);
+
+    const stats = document.querySelector('.stats p');
+    if (stats) stats.textContent = `${shown} ${shown > 1 ? 'morceaux trouv\u00e9s' : 'morceau trouv\u00e9'}`;
+
+    // Each facet counted with every filter but its own, like /api/facets
+    const facets = {};
+    Object.keys(catalog.columns).forEach(facet => {
+        const keep = clientMatcher(catalog, state.filters, facet);
+        const column = catalog.columns[facet];
+        const tally = new Array(catalog.dictionaries[facet].length).fill(0);
+        for (let i = 0; i < column.length; i++) {
+            if (keep(i)) tally[column[i]]++;
+        }
+        facets[facet] = new Map(catalog.dictionaries[facet].map((value, code) => [value, tally[code]]));
+    });
+    showFacetCounts(facets);
+
+    const query = new URLSearchParams({ sort: state.sort });
+    Object.entries(state.filters).forEach(([facet, value]) => {
+        if (value !== 'all') query.set(facet, value);
+    });
+    history.replaceState(null, '', '/?' + query.toString());
+}
+
+// --- Search typeahead ---
+
+function setupSearchSuggestions() {
+    const input = document.querySelector('.search-input[list]');
+    const datalist = document.getElementById('searchSuggestions');
+    if (!input || !datalist) return;
+    let controller = null;
+    input.addEventListener('input', async () => {
+        const q = input.value.trim();
+        if (controller) controller.abort();
+        if (q.length === 0) {
+            datalist.innerHTML = '';
+            return;
+        }
+        controller = new AbortController();
+        try {
+            const response = await fetch('/api/suggest?field=all&q=' + encodeURIComponent(q), { signal: controller.signal });
+            const data = await response.json();
+            if (!data.success) return;
+            datalist.innerHTML = '';
+            data.suggestions.forEach(s => {
+                const option = document.createElement('option');
+                option.value = s.value;
+                datalist.appendChild(option);
+            });
+        } catch (error) {
+            if (error.name !== 'AbortError') console.error('Error fetching suggestions:', error);
+        }
+    });
+}
+
 function jumpToLetter(letter) {
     const cards = document.querySelectorAll('.video-card');
     for (let card of cards) {
-        if (card.dataset.letter === letter) {
+        if (card.dataset.letter === letter && card.style.display !== 'none') {
             card.scrollIntoView({ behavior: 'smooth', block: 'start' });
             break;
         }
@@ -0,0 +1,576 @@
+"""
+Performance checks for the catalog views.
+
+Run from the repository root against throwaway copies of the database:
+    python utils/benchmark.py query-count
+    python utils/benchmark.py stream-memory
+    python utils/benchmark.py facet-index
+    python utils/benchmark.py suggest-latency
+    python utils/benchmark.py db-connections
+    python utils/benchmark.py write-concurrency
+    python utils/benchmark.py drop-video-text
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+
+from app import migrations
+from app.config import Config
+from app.db import SONG_COLUMNS
+from app.facet_index import FacetIndex
+from app.suggest import SuggestIndex
+
+SOURCE_DB = os.path.join(ROOT, 'database', 'piano_jazz_videos.db')
+
+
+def make_catalog(path, extra_videos, songs_per_video=2):
+    """Copy the real database to `path` and pad it with synthetic videos/songs."""
+    shutil.copy(SOURCE_DB, path)
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    for i in range(extra_videos):
+        cursor.execute('''
+            INSERT INTO videos (video_id, title, description, url, published_at, thumbnail_url)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (f'bench{i:07d}', f'Bench video {i}', 'Synthetic description ' * 20,
+              f'https://youtube.com/watch?v=bench{i:07d}', f'2020-01-01T00:{i % 60:02d}:00Z', None))
+        video_id = cursor.lastrowid
+        for part in range(1, songs_per_video + 1):
+            cursor.execute('''
+                INSERT INTO songs (video_id, song_title, composer, performer, style, era,
+                                   part_number, total_parts, published_at, deleted)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)
+            ''', (video_id, f'Bench song {i}-{part}', f'Composer {i % 50}', f'Performer {i % 80}',
+                  'Jazz', f'{1940 + i % 8 * 10}s', part, songs_per_video,
+                  f'2020-01-01T00:{i % 60:02d}:00Z'))
+    conn.commit()
+    conn.close()
+
+
+def make_app(path):
+    Config.DATABASE_PATH = path
+    # Throwaway copies of the real database: bring them to the current schema
+    Config.MIGRATE_ON_STARTUP = True
+    from app import create_app
+    return create_app('production')
+
+
+def count_queries(path, url):
+    """Return the number of SQL statements one (warm) request to `url` runs."""
+    from app.db import get_db
+
+    app = make_app(path)
+    statements = []
+
+    @app.before_request
+    def trace_statements():
+        get_db().set_trace_callback(statements.append)
+
+    client = app.test_client()
+    client.get(url)  # warm-up: builds the catalog snapshot
+    app.extensions['page_cache'].clear()  # measure a render, not a cache hit
+    statements.clear()
+    response = client.get(url)
+    assert response.status_code == 200, response.status_code
+    return len(statements)
+
+
+def cmd_query_count(args):
+    """Fail if the number of queries per request grows with the number of videos."""
+    tmp = tempfile.mkdtemp()
+    try:
+        failed = False
+        for url in args.urls:
+            counts = []
+            for size in (args.videos, args.videos * 2):
+                path = os.path.join(tmp, f'bench_{size}.db')
+                if not os.path.exists(path):
+                    make_catalog(path, size)
+                counts.append(count_queries(path, url))
+            grows = counts[1] > counts[0]
+            failed = failed or grows
+            print(f"{'FAIL' if grows else 'ok  '} {url}: {counts[0]} queries at +{args.videos} videos, "
+                  f"{counts[1]} at +{args.videos * 2}")
+        return 1 if failed else 0
+    finally:
+        shutil.rmtree(tmp)
+
+
+def measure_response(path, url, stream):
+    """Return (time to first chunk, total time, bytes, peak traced memory) for one request."""
+    app = make_app(path)
+    app.config['STREAM_LISTINGS'] = stream
+    client = app.test_client()
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, buffered=False)
+    first_chunk = None
+    size = 0
+    for chunk in response.response:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return first_chunk, elapsed, size, peak
+
+
+def cmd_stream_memory(args):
+    """Check that the streamed songs page uses the same memory whatever the catalog size."""
+    tmp = tempfile.mkdtemp()
+    try:
+        failed = False
+        for url in args.urls:
+            peaks = {}
+            for stream in (False, True):
+                for size in (args.videos, args.videos * 2):
+                    path = os.path.join(tmp, f'bench_{size}.db')
+                    if not os.path.exists(path):
+                        make_catalog(path, size)
+                    ttfb, elapsed, body, peak = measure_response(path, url, stream)
+                    peaks[stream, size] = peak
+                    print(f"{'stream' if stream else 'render'} {url} +{size * 2} songs: "
+                          f"first byte {ttfb * 1000:.0f} ms, total {elapsed * 1000:.0f} ms, "
+                          f"{body / 1e6:.1f} MB body, peak {peak / 1e6:.1f} MB")
+            grows = peaks[True, args.videos * 2] > peaks[True, args.videos] * 1.25
+            failed = failed or grows
+            print(f"{'FAIL' if grows else 'ok  '} {url}: streamed peak "
+                  f"{peaks[True, args.videos] / 1e6:.1f} MB -> {peaks[True, args.videos * 2] / 1e6:.1f} MB")
+        return 1 if failed else 0
+    finally:
+        shutil.rmtree(tmp)
+
+
+FACET_CASES = [
+    {'style': 'jazz'},
+    {'composer': 'Composer 7', 'style': 'jazz'},
+    {'category': 'BO Films', 'era': '1960s', 'depth': 'Mention'},
+    {'performer': 'Performer 3', 'era': '19', 'depth': 'Théorie'},
+]
+
+
+def make_rows(count, seed=0):
+    """Synthetic catalog rows with the columns FacetIndex reads, as plain dicts."""
+    rnd = random.Random(seed)
+    categories = ['BO Films', 'Génériques TV', 'Chansons/Standards', 'Théorie/Analyse', 'Autres']
+    styles = ['Jazz', 'Bebop', 'Jazz modal', 'Bossa nova', 'Classique', None]
+    depths = ['Mention', 'Théorie', 'Analyse', None]
+    composers = [f'Composer {i}' for i in range(max(count // 20, 50))]
+    performers = [f'Performer {i}' for i in range(max(count // 10, 80))]
+    rows = []
+    for i in range(count):
+        performer = rnd.choice(performers)
+        rows.append({
+            'id': i + 1, 'song_title': f'Bench song {i}',
+            'composer': rnd.choice(composers), 'performer': performer,
+            'featured_artists': f'["{rnd.choice(performers)}"]' if i % 4 == 0 else None,
+            'songwriters': None, 'other_musicians': None,
+            'style': rnd.choice(styles), 'era': f'{1920 + rnd.randrange(10) * 10}s',
+            'analysis_depth': rnd.choice(depths), 'category': rnd.choice(categories),
+            'original_artist': None, 'album': f'Album {i // 12}',
+            'video_title': '', 'description': '',
+            'published_at': f'20{rnd.randrange(10, 25)}-{rnd.randrange(1, 13):02d}-01T00:00:00Z',
+        })
+    return rows
+
+
+def list_filter(rows, filters):
+    """The list-comprehension path: one walk of the (shrinking) list per active filter."""
+    result = rows
+    for name in ('composer', 'performer', 'style', 'era'):
+        if filters.get(name):
+            value = filters[name].lower()
+            result = [r for r in result if r[name] and value in r[name].lower()]
+    if filters.get('category'):
+        result = [r for r in result if r['category'] == filters['category']]
+    if filters.get('depth'):
+        result = [r for r in result if r['analysis_depth'] == filters['depth']]
+    return sorted(result, key=lambda r: r['published_at'] or '', reverse=True)
+
+
+def list_counts(rows, filters):
+    """Facet counts the list way: refilter without each facet's own filter, then count."""
+    columns = {'category': 'category', 'composer': 'composer', 'performer': 'performer',
+               'style': 'style', 'era': 'era', 'depth': 'analysis_depth'}
+    counts = {}
+    for facet, column in columns.items():
+        tally = {}
+        for r in list_filter(rows, {k: v for k, v in filters.items() if k != facet}):
+            if r[column]:
+                tally[r[column]] = tally.get(r[column], 0) + 1
+        counts[facet] = sorted(tally.items())
+    return counts
+
+
+def best_of(func, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def cmd_facet_index(args):
+    """Compare list-comprehension filtering with the bitmap facet index."""
+    for size in args.sizes:
+        rows = make_rows(size)
+        start = time.perf_counter()
+        index = FacetIndex(rows)
+        print(f"{size} songs: index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+        repeat = 5 if size <= 100_000 else 2
+        for filters in FACET_CASES:
+            matched = len(index.select(filters))
+            lists = best_of(lambda: list_filter(rows, filters), repeat)
+            bitmap = best_of(lambda: [rows[p] for p in index.select(filters)], repeat)
+            list_c = best_of(lambda: list_counts(rows, filters), repeat)
+            bitmap_c = best_of(lambda: index.counts(filters), repeat)
+            print(f"  {filters} ({matched} songs): filter {lists * 1000:.2f} -> {bitmap * 1000:.2f} ms, "
+                  f"facet counts {list_c * 1000:.2f} -> {bitmap_c * 1000:.2f} ms")
+        del rows, index
+    return 0
+
+
+def cmd_suggest_latency(args):
+    """Fail if the p99 latency of /api/suggest lookups exceeds 1 ms."""
+    rnd = random.Random(1)
+    failed = False
+    for size in args.sizes:
+        rows = make_rows(size)
+        start = time.perf_counter()
+        index = SuggestIndex(rows)
+        built = time.perf_counter() - start
+
+        # Every prefix length of randomly picked values, as typed keystroke by keystroke
+        queries = []
+        for row in rnd.sample(rows, min(size, 300)):
+            for field, column in (('title', 'song_title'), ('composer', 'composer'), ('all', 'performer')):
+                queries.extend((field, row[column][:n]) for n in range(1, len(row[column]) + 1))
+        latencies = []
+        for field, prefix in queries:
+            start = time.perf_counter()
+            index.suggest(field, prefix)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+        p50, p99 = latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.99)]
+        slow = p99 > 0.001
+        failed = failed or slow
+        print(f"{'FAIL' if slow else 'ok  '} {size} songs: built in {built * 1000:.0f} ms, "
+              f"{len(queries)} lookups p50 {p50 * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms")
+    return 1 if failed else 0
+
+
+def per_request_connection(path, song_id):
+    """One request's worth of database work before persistent connections."""
+    from app.categories import categorize_video
+
+    conn = sqlite3.connect(path, timeout=10.0)
+    conn.row_factory = sqlite3.Row
+    conn.create_function('categorize_video', 2, categorize_video, deterministic=True)
+    conn.execute('SELECT song_title FROM songs WHERE id = ?', (song_id,)).fetchone()
+    conn.close()
+
+
+def reader_latencies(read, path, hold, duration):
+    """Latencies of `read()` while another connection keeps taking `hold`-second exclusive write locks."""
+    stop = threading.Event()
+
+    def writer():
+        conn = sqlite3.connect(path, timeout=30.0, isolation_level=None)
+        while not stop.is_set():
+            conn.execute('BEGIN EXCLUSIVE')
+            conn.execute('UPDATE songs SET context_notes = context_notes WHERE id = (SELECT MIN(id) FROM songs)')
+            time.sleep(hold)
+            conn.execute('COMMIT')
+            time.sleep(0.005)
+        conn.close()
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    latencies = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        read()
+        latencies.append(time.perf_counter() - start)
+    stop.set()
+    thread.join()
+    return sorted(latencies)
+
+
+def cmd_db_connections(args):
+    """Fail if readers wait for writers; compares per-request connections with persistent WAL ones."""
+    from app.db import get_db
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'bench.db')
+        make_catalog(path, 0)
+        conn = sqlite3.connect(path)
+        conn.execute('PRAGMA journal_mode = DELETE')
+        song_ids = [row[0] for row in conn.execute('SELECT id FROM songs')]
+        conn.close()
+        rnd = random.Random(1)
+
+        def old_read():
+            per_request_connection(path, rnd.choice(song_ids))
+
+        before = reader_latencies(old_read, path, args.hold, args.duration)
+
+        app = make_app(path)  # switches the file to WAL
+
+        def old_request():
+            with app.test_request_context('/'):
+                old_read()
+
+        def new_read():
+            with app.test_request_context('/'):
+                get_db().execute('SELECT song_title FROM songs WHERE id = ?', (rnd.choice(song_ids),)).fetchone()
+
+        old = best_of(lambda: [old_request() for _ in range(args.requests)], 3) / args.requests
+        new = best_of(lambda: [new_read() for _ in range(args.requests)], 3) / args.requests
+        after = reader_latencies(new_read, path, args.hold, args.duration)
+
+        print(f"request with one query: {old * 1e6:.0f} us -> {new * 1e6:.0f} us")
+        for label, latencies in (('rollback journal, connection per request', before),
+                                 ('WAL, persistent read-only connection', after)):
+            print(f"  {label}: {len(latencies)} reads during {args.hold * 1000:.0f} ms write locks, "
+                  f"p50 {latencies[len(latencies) // 2] * 1000:.3f} ms, max {latencies[-1] * 1000:.1f} ms")
+        blocked = after[-1] >= args.hold
+        print(f"{'FAIL' if blocked else 'ok  '} readers {'waited' if blocked else 'never waited'} for the writer under WAL")
+        return 1 if blocked else 0
+    finally:
+        shutil.rmtree(tmp)
+
+
+def admin_client(app):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['admin'] = True
+    return client
+
+
+def cmd_write_concurrency(args):
+    """Fail unless every admin edit made during LLM extractions succeeds and lands."""
+    import app.routes.api as api
+    from app.db import get_db
+
+    tmp = tempfile.mkdtemp()
+    try:
+        path = os.path.join(tmp, 'bench.db')
+        make_catalog(path, 0)
+        app = make_app(path)
+        with app.app_context():
+            rows = get_db().execute('SELECT id, video_id FROM songs WHERE deleted = 0 ORDER BY id').fetchall()
+        videos = sorted({video_id for song_id, video_id in rows})[:args.extractions]
+        songs = [song_id for song_id, video_id in rows if video_id not in videos]
+
+        def slow_extraction(title, description, url, prompt_guidance=''):
+            time.sleep(args.llm_seconds)  # an OpenAI round trip
+            return [{'song_title': f'Extracted {title} {n}', 'composer': 'Bench Composer',
+                     'part_number': n, 'total_parts': 3} for n in (1, 2, 3)]
+        api._extract_video_data = slow_extraction
+
+        extraction_results = []
+
+        def extract(video_id):
+            # Queued as a background job: wait for it like the admin UI would
+            client = admin_client(app)
+            status_url = client.post('/api/enrich_video', json={'video_id': video_id}).get_json()['status_url']
+            while True:
+                job = client.get(status_url).get_json()['job']
+                if job['status'] in ('done', 'failed'):
+                    extraction_results.append(job)
+                    return
+                time.sleep(0.05)
+
+        edits = []
+        expected = {}
+        lock = threading.Lock()
+
+        def edit(worker):
+            client = admin_client(app)
+            rnd = random.Random(worker)
+            # Each session edits its own songs, so the last edit it made to one is what must be stored
+            own = songs[worker::args.editors]
+            for n in range(args.edits):
+                song_id = rnd.choice(own)
+                value = f'Edit {worker}-{n}'
+                start = time.perf_counter()
+                response = client.post('/api/update_song', json={'id': song_id, 'field': 'context_notes',
+                                                                 'value': value})
+                with lock:
+                    edits.append((time.perf_counter() - start, response.status_code, response.get_json()))
+                    if response.status_code == 200:
+                        expected[song_id] = value
+
+        extractors = [threading.Thread(target=extract, args=(video_id,)) for video_id in videos]
+        for thread in extractors:
+            thread.start()
+        time.sleep(0.1)  # the extractions are now waiting on the "LLM"
+        start = time.perf_counter()
+        editors = [threading.Thread(target=edit, args=(worker,)) for worker in range(args.editors)]
+        for thread in editors:
+            thread.start()
+        for thread in editors:
+            thread.join()
+        edit_time = time.perf_counter() - start
+        for thread in extractors:
+            thread.join()
+
+        failed_edits = [(status, body) for elapsed, status, body in edits if status != 200 or not body['success']]
+        failed_extractions = [job for job in extraction_results if job['status'] != 'done']
+        with app.app_context():
+            db = get_db()
+            stored = dict(db.execute('SELECT id, context_notes FROM songs').fetchall())
+            extracted = db.execute("SELECT COUNT(*) FROM songs WHERE song_title LIKE 'Extracted %'").fetchone()[0]
+        lost = [song_id for song_id, value in expected.items() if stored.get(song_id) != value]
+
+        latencies = sorted(elapsed for elapsed, status, body in edits)
+        writer = app.extensions['writer']
+        print(f"{len(edits)} edits from {args.editors} threads in {edit_time * 1000:.0f} ms, during "
+              f"{len(videos)} extractions of {args.llm_seconds:.1f} s: p50 {latencies[len(latencies) // 2] * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+        print(f"writer: {writer.writes} writes in {writer.commits} commits")
+        ok = not failed_edits and not failed_extractions and not lost and extracted == 3 * len(videos)
+        print(f"{'ok  ' if ok else 'FAIL'} {len(failed_edits)} failed edits, {len(lost)} lost edits, "
+              f"{len(failed_extractions)} failed extractions, {extracted} extracted songs stored")
+        return 0 if ok else 1
+    finally:
+        shutil.rmtree(tmp)
+
+
+# SONG_COLUMNS before migration 0006, when songs carried copies of the video text
+COPIED_SONG_COLUMNS = '''
+    s.id, s.video_id, s.song_title, s.composer, s.timestamp,
+    s.part_number, s.total_parts, s.performer, s.original_artist,
+    s.songwriters, s.composition_year, s.style, s.era,
+    s.other_musicians, s.additional_info, s.video_title,
+    s.video_url as url, s.video_description as description,
+    s.published_at, s.album, s.record_label, s.recording_year,
+    s.featured_artists, s.context_notes, s.analysis_depth,
+    v.thumbnail_url, v.video_type,
+    COALESCE(s.category, v.category) as category
+'''
+GET_SONGS = '''
+    SELECT {} FROM songs s LEFT JOIN videos v ON s.video_id = v.id
+    WHERE (s.deleted IS NULL OR s.deleted = 0) ORDER BY s.song_title ASC
+'''
+
+
+def schema_footprint(path, columns, repeat):
+    """Return (file bytes, songs table bytes, get_songs() time on a fresh connection, warm time)."""
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')  # the file only shrinks once the WAL is written back
+    table = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'songs'").fetchone()[0]
+    conn.close()
+    query = GET_SONGS.format(columns)
+
+    def cold():
+        conn = sqlite3.connect(path)
+        conn.execute(query).fetchall()
+        conn.close()
+
+    conn = sqlite3.connect(path)
+    warm = best_of(lambda: conn.execute(query).fetchall(), repeat)
+    conn.close()
+    return os.path.getsize(path), table, best_of(cold, repeat), warm
+
+
+def cmd_drop_video_text(args):
+    """Measure migration 0006: size and get_songs() time before and after, and the song text it archives."""
+    tmp = tempfile.mkdtemp()
+    try:
+        from app import create_app
+        from app.db import close_db, get_db
+
+        path = os.path.join(tmp, 'bench.db')
+        shutil.copy(SOURCE_DB, path)
+        Config.DATABASE_PATH = path
+        Config.MIGRATE_ON_STARTUP = False  # stop at the versions around 0006
+        app = create_app('production')
+        with app.app_context():
+            db = get_db()
+            migrations.migrate(db, log=lambda message: None, target=5)
+            db.execute('VACUUM')  # 0006 vacuums too: compare compacted files
+            close_db()
+        before = schema_footprint(path, COPIED_SONG_COLUMNS, args.repeat)
+
+        with app.app_context():
+            db = get_db()
+            migrations.migrate(db, target=6)
+            archived = db.execute('SELECT COUNT(*) FROM song_video_text_archive').fetchone()[0]
+            close_db()
+        after = schema_footprint(path, SONG_COLUMNS, args.repeat)
+
+        for label, (old, new), unit in zip(
+                ('database file', 'songs table', 'get_songs() cold', 'get_songs() warm'),
+                zip(before, after), ('KB', 'KB', 'ms', 'ms')):
+            scale = 1e-3 if unit == 'KB' else 1e3
+            print(f"{label}: {old * scale:.2f} -> {new * scale:.2f} {unit}")
+        print(f"{archived} songs' differing video text kept in song_video_text_archive")
+        shrunk = after[1] < before[1]
+        print(f"{'ok  ' if shrunk else 'FAIL'} songs table {'shrank' if shrunk else 'did not shrink'}")
+        return 0 if shrunk else 1
+    finally:
+        shutil.rmtree(tmp)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('query-count', help=cmd_query_count.__doc__)
+    p.add_argument('--videos', type=int, default=200, help='synthetic videos added in the first run')
+    p.add_argument('urls', nargs='*', default=['/?view=videos', '/?view=videos&sort=alpha', '/', '/?view=index'])
+    p.set_defaults(func=cmd_query_count)
+
+    p = sub.add_parser('stream-memory', help=cmd_stream_memory.__doc__)
+    p.add_argument('--videos', type=int, default=5000, help='synthetic videos (2 songs each) in the first run')
+    p.add_argument('urls', nargs='*', default=['/', '/?sort=alpha'])
+    p.set_defaults(func=cmd_stream_memory)
+
+    p = sub.add_parser('facet-index', help=cmd_facet_index.__doc__)
+    p.add_argument('--sizes', type=int, nargs='+', default=[1000, 100_000, 1_000_000])
+    p.set_defaults(func=cmd_facet_index)
+
+    p = sub.add_parser('suggest-latency', help=cmd_suggest_latency.__doc__)
+    p.add_argument('--sizes', type=int, nargs='+', default=[1000, 100_000])
+    p.set_defaults(func=cmd_suggest_latency)
+
+    p = sub.add_parser('db-connections', help=cmd_db_connections.__doc__)
+    p.add_argument('--requests', type=int, default=2000, help='requests timed for the per-request overhead')
+    p.add_argument('--hold', type=float, default=0.2, help='seconds the writer holds its lock')
+    p.add_argument('--duration', type=float, default=2.0, help='seconds of concurrent reading')
+    p.set_defaults(func=cmd_db_connections)
+
+    p = sub.add_parser('write-concurrency', help=cmd_write_concurrency.__doc__)
+    p.add_argument('--editors', type=int, default=8, help='concurrent admin sessions')
+    p.add_argument('--edits', type=int, default=25, help='edits per session')
+    p.add_argument('--extractions', type=int, default=2, help='concurrent enrich_video calls')
+    p.add_argument('--llm-seconds', type=float, default=2.0, help='simulated LLM latency')
+    p.set_defaults(func=cmd_write_concurrency)
+
+    p = sub.add_parser('drop-video-text', help=cmd_drop_video_text.__doc__)
+    p.add_argument('--repeat', type=int, default=200, help='timed get_songs() runs, best kept')
+    p.set_defaults(func=cmd_drop_video_text)
+
+    args = parser.parse_args()
+    sys.exit(args.func(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -190,9 +190,8 @@ def main():
                         style, era, additional_info,
                         part_number, total_parts,
                         album, record_label, recording_year,
-                        featured_artists, context_notes,
-                        video_title, video_url, video_description, published_at
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        featured_artists, context_notes, published_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 ''', (
                     video_id,
                     song.get('song_title', title),
@@ -211,9 +210,6 @@ def main():
                     song.get('recording_year'),
                     featured_artists,
                     song.get('context_notes'),
-                    title,
-                    url,
-                    description,
                     None  # published_at - will need to get from videos table
                 ))
 